@@ -0,0 +1,566 @@
+"""Offline benchmarks for the fetchers, the data preparation and the figures.
+
+    python benchmarks/bench.py                  run against the fixtures
+    python benchmarks/bench.py --record GARAN   record fixtures from the live upstreams
+    python benchmarks/bench.py --latency 150    add 150 ms to every stand-in call
+
+Without recorded fixtures synthetic ones are generated, so the suite runs
+without network access. Every run is appended to benchmarks/results.jsonl
+and compared with the previous one.
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import BaseAdapter
+
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+FIXTURE_DIR = os.path.join(BENCH_DIR, 'fixtures')
+RESULTS_PATH = os.path.join(BENCH_DIR, 'results.jsonl')
+
+SYMBOL = 'GARAN'
+WINDOWS = (250, 500, 1000, 2000)
+UNIVERSE_SIZE = 500
+COMPARED_SYMBOLS = 50
+REGRESSION_THRESHOLD = 0.2
+
+# fixture name -> url pattern served by the stand-in HTTP adapter
+PAGES = {
+    'ratios.html': r'https://uzmanpara\.milliyet\.com\.tr/borsa/anahtar-oranlar/',
+    'news.html': r'https://uzmanpara\.milliyet\.com\.tr/hisse/hisse-haberleri/',
+    'kap_listing.html': r'https://www\.kap\.org\.tr/tr/bist-sirketler',
+    'kap_company.html': r'https://www\.kap\.org\.tr/tr/sirket-bilgileri/',
+    'logo.png': r'https://www\.kap\.org\.tr/.*\.(png|jpg)',
+}
+
+
+def fixture_path(name):
+    return os.path.join(FIXTURE_DIR, name)
+
+
+# -- fixtures ----------------------------------------------------------------
+
+def synthetic_fixtures():
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range(end=datetime.now(), periods=1400, name='Date')
+    close = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, len(dates))))
+    spread = close * rng.uniform(0, 0.03, len(dates))
+    historical = pd.DataFrame({
+        'Open': close + rng.normal(0, 1, len(dates)) * spread / 2,
+        'High': close + spread,
+        'Low': close - spread,
+        'Close': close,
+        'Volume': rng.integers(1e5, 1e7, len(dates)),
+        'Currency': 'TRY',
+    }, index=dates)
+
+    symbols = [SYMBOL] + [f'S{i:04d}' for i in range(499)]
+    stocks = pd.DataFrame({
+        'country': 'turkey',
+        'name': [f'{s} Holding' for s in symbols],
+        'full_name': [f'{s} Holding A.S.' for s in symbols],
+        'isin': [f'TRA{s}00000' for s in symbols],
+        'currency': 'TRY',
+        'symbol': symbols,
+    })
+
+    information = pd.DataFrame([{
+        'Stock Symbol': SYMBOL, 'Prev. Close': 10.2, 'Todays Range': '10.1 - 10.4',
+        'Revenue': 4.1e10, 'Open': 10.2, '52 wk Range': '6.4 - 12.1', 'EPS': 2.1,
+        'Volume': 8.1e7, 'Market Cap': 4.3e10, 'Dividend (Yield)': 'N/A', 'Average Vol. (3m)': 9.2e7,
+        'P/E Ratio': 4.9, 'Beta': 1.2, '1-Year Change': '12.3%', 'Shares Outstanding': 4.2e9,
+        'Next Earnings Date': '04/05/2021',
+    }])
+
+    technical_indicators = pd.DataFrame({
+        'technical_indicator': ['RSI(14)', 'STOCH(9,6)', 'STOCHRSI(14)', 'MACD(12,26)', 'ADX(14)', 'Williams %R',
+                                'CCI(14)', 'ATR(14)', 'Highs/Lows(14)', 'Ultimate Oscillator', 'ROC',
+                                'Bull/Bear Power(13)'],
+        'value': rng.normal(50, 20, 12).round(3),
+        'signal': ['buy', 'sell', 'neutral', 'buy', 'buy', 'sell', 'buy', 'less_volatility', 'buy', 'neutral',
+                   'buy', 'sell'],
+    })
+
+    financial_summary = pd.DataFrame(
+        rng.normal(1e9, 2e8, (4, 4)),
+        index=pd.Index(pd.date_range('2017-12-31', periods=4, freq='A'), name='Date'),
+        columns=['Total Revenue', 'Gross Profit', 'Operating Income', 'Net Income']
+    )
+
+    dividends = pd.DataFrame({
+        'Date': pd.date_range('2016-04-01', periods=5, freq='A'),
+        'Dividend': rng.uniform(0.1, 0.5, 5),
+        'Type': ['trailing_twelve_months', 'annual', 'quarterly', 'annual', 'other'],
+        'Payment Date': pd.date_range('2016-04-10', periods=5, freq='A'),
+        'Yield': ['2.1%', '1.9%', '3.0%', '2.4%', '1.1%'],
+    })
+
+    profile = {'url': 'https://www.investing.com', 'desc': 'Türkiye Garanti Bankasi A.S. provides banking products. ' * 20}
+
+    ratio_rows = ''.join(
+        f'<tr><td class="currency">Oran {i}</td><td class="">{rng.uniform(-50, 5000):,.2f}</td></tr>'
+        .replace(',', 'X').replace('.', ',').replace('X', '.')
+        for i in range(30)
+    )
+    filler = ''.join(f'<div class="f"><p>{i}</p><a href="/x/{i}">x</a></div>' for i in range(2000))
+    ratios = f'<html><head><meta charset="utf-8"></head><body>{filler}<div class="detL"><table>{ratio_rows}</table></div>{filler}</body></html>'
+    news_items = ''.join(
+        f'<li><a href="/haber/{i}/" title="Haber {i}">Şirket haberi {i}</a><span class="date">0{i % 9 + 1}.02.2021 10:{i:02d}</span></li>'
+        for i in range(40)
+    )
+    news = f'<html><head><meta charset="utf-8"></head><body>{filler}<ul class="newsUl">{news_items}</ul>{filler}</body></html>'
+    listing_links = ''.join(f'<div><a href="/tr/sirket-bilgileri/ozet/{i}">{s}</a></div>' for i, s in enumerate(symbols))
+    listing = f'<html><head><meta charset="utf-8"></head><body>{listing_links}</body></html>'
+    company = '<html><head><meta charset="utf-8"></head><body><img class="comp-logo" src="/Uploads/logo.png"></body></html>'
+
+    return {
+        'stocks.pkl': stocks,
+        'historical.pkl': historical,
+        'information.pkl': information,
+        'technical_indicators.pkl': technical_indicators,
+        'financial_summary.pkl': financial_summary,
+        'dividends.pkl': dividends,
+        'profile.pkl': profile,
+        'ratios.html': ratios.encode('utf-8'),
+        'news.html': news.encode('utf-8'),
+        'kap_listing.html': listing.encode('utf-8'),
+        'kap_company.html': company.encode('utf-8'),
+        'logo.png': b'\x89PNG\r\n\x1a\n' + bytes(2048),
+    }
+
+
+def recorded_fixtures(symbol):
+    import investpy as inp
+
+    end_date = datetime.now()
+    start_date = end_date - pd.Timedelta(days=2000)
+    fixtures = {
+        'stocks.pkl': inp.get_stocks(country='turkey'),
+        'historical.pkl': inp.get_stock_historical_data(
+            stock=symbol, country='turkey', from_date=start_date.strftime('%d/%m/%Y'),
+            to_date=end_date.strftime('%d/%m/%Y'), as_json=False, order='ascending'),
+        'information.pkl': inp.get_stock_information(stock=symbol, country='turkey'),
+        'technical_indicators.pkl': inp.technical_indicators(
+            name=symbol, country='turkey', product_type='stock', interval='1hour'),
+        'financial_summary.pkl': inp.stocks.get_stock_financial_summary(
+            symbol, 'turkey', summary_type='income_statement', period='annual'),
+        'dividends.pkl': inp.stocks.get_stock_dividends(symbol, 'turkey'),
+        'profile.pkl': inp.get_stock_company_profile(stock=symbol, country='turkey'),
+    }
+
+    base_url = 'https://uzmanpara.milliyet.com.tr'
+    kap_url = 'https://www.kap.org.tr'
+    fixtures['ratios.html'] = requests.get(f'{base_url}/borsa/anahtar-oranlar/{symbol}/', timeout=10).content
+    fixtures['news.html'] = requests.get(f'{base_url}/hisse/hisse-haberleri/{symbol}/', timeout=10).content
+    fixtures['kap_listing.html'] = requests.get(f'{kap_url}/tr/bist-sirketler', timeout=10).content
+
+    sys.path.insert(0, ROOT_DIR)
+    import kap
+    href = kap.parse_listing(fixtures['kap_listing.html'])[symbol]
+    fixtures['kap_company.html'] = requests.get(kap_url + href, timeout=10).content
+    fixtures['logo.png'] = requests.get(kap.parse_logo_url(fixtures['kap_company.html']), timeout=10).content
+    return fixtures
+
+
+def write_fixtures(fixtures):
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    for name, value in fixtures.items():
+        if name.endswith('.pkl'):
+            pd.to_pickle(value, fixture_path(name))
+        else:
+            with open(fixture_path(name), 'wb') as f:
+                f.write(value)
+
+
+def load_fixtures():
+    fixtures = {}
+    for name in sorted(os.listdir(FIXTURE_DIR)):
+        if name.endswith('.pkl'):
+            fixtures[name] = pd.read_pickle(fixture_path(name))
+        else:
+            with open(fixture_path(name), 'rb') as f:
+                fixtures[name] = f.read()
+    return fixtures
+
+
+# -- upstream stand-ins -------------------------------------------------------
+
+class FakeInvestpy:
+    # the investpy calls main.py makes, answered from the fixtures
+
+    def __init__(self, fixtures, latency):
+        self.fixtures = fixtures
+        self.latency = latency
+        self.stocks = self
+
+    def _get(self, name):
+        time.sleep(self.latency)
+        value = self.fixtures[name]
+        return value.copy() if hasattr(value, 'copy') else value
+
+    def get_stocks(self, country):
+        return self._get('stocks.pkl')
+
+    def get_stock_historical_data(self, stock, country, from_date, to_date, as_json=False, order='ascending'):
+        df = self._get('historical.pkl')
+        start_date = datetime.strptime(from_date, '%d/%m/%Y')
+        end_date = datetime.strptime(to_date, '%d/%m/%Y')
+        df = df[(df.index >= start_date) & (df.index <= end_date)]
+        if df.empty:
+            raise IndexError('ERR#0004: data retrieval error while scraping.')
+        return df
+
+    def get_index_historical_data(self, index, country, from_date, to_date, as_json=False, order='ascending'):
+        return self.get_stock_historical_data(index, country, from_date, to_date, as_json, order)
+
+    def get_stock_recent_data(self, stock, country, as_json=False, order='ascending'):
+        # the last month of bars, moved so that the last one is today's
+        df = self._get('historical.pkl').iloc[-22:]
+        df.index = df.index + (pd.Timestamp(datetime.now().date()) - df.index[-1])
+        return df
+
+    def get_stock_company_profile(self, stock, country):
+        return self._get('profile.pkl')
+
+    def get_stock_information(self, stock, country):
+        return self._get('information.pkl')
+
+    def technical_indicators(self, name, country, product_type, interval):
+        return self._get('technical_indicators.pkl')
+
+    def get_stock_financial_summary(self, stock, country, summary_type, period):
+        return self._get('financial_summary.pkl')
+
+    def get_stock_dividends(self, stock, country):
+        return self._get('dividends.pkl')
+
+
+class FixtureAdapter(BaseAdapter):
+    # answers the scraping requests from the fixtures, honouring ETags
+
+    def __init__(self, fixtures, latency):
+        super().__init__()
+        self.fixtures = fixtures
+        self.latency = latency
+
+    def send(self, request, **kwargs):
+        time.sleep(self.latency)
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        for name, pattern in PAGES.items():
+            if re.match(pattern, request.url):
+                etag = '"' + hashlib.md5(self.fixtures[name]).hexdigest() + '"'
+                response.headers['ETag'] = etag
+                if request.headers.get('If-None-Match') == etag:
+                    response.status_code = 304
+                    response._content = b''
+                else:
+                    response.status_code = 200
+                    response._content = self.fixtures[name]
+                return response
+        response.status_code = 404
+        response._content = b''
+        return response
+
+    def close(self):
+        pass
+
+
+class FakeTranslator:
+    latency = 0
+
+    def __init__(self, service_urls=None):
+        pass
+
+    def translate(self, text, src='en', dest='tr'):
+        if isinstance(text, list):
+            return [self.translate(t, src, dest) for t in text]
+        time.sleep(self.latency)
+
+        class Translated:
+            pass
+
+        result = Translated()
+        result.text = text
+        return result
+
+
+def install_stand_ins(app, fixtures, latency):
+    import http_client
+    import kap
+    import snapshot
+    import translation
+    import upstream
+
+    # the stand-ins are local, pacing them would only measure the sleeps
+    upstream._buckets.clear()
+    # the universe crawler would keep fetching through every later timing
+    kap.start_crawl = lambda symbols: None
+    app.inp = FakeInvestpy(fixtures, latency)
+    FakeTranslator.latency = latency
+    translation.googletrans = types.SimpleNamespace(Translator=FakeTranslator)
+    snapshot.SNAPSHOT_PATH = os.path.join(os.environ['BIST_DATA_DIR'], 'companies.csv')
+    snapshot.save_companies(snapshot.companies_table(fixtures['stocks.pkl']))
+    adapter = FixtureAdapter(fixtures, latency)
+    http_client.session().mount('https://uzmanpara.milliyet.com.tr', adapter)
+    http_client.session().mount('https://www.kap.org.tr', adapter)
+
+
+# -- timing -------------------------------------------------------------------
+
+def measure(func, repeat, setup=None):
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return 1000 * statistics.median(times)
+
+
+def fetcher_cases(app):
+    import cache
+    import kap
+    import translation
+
+    def clear_kap():
+        kap._index = None
+        shutil.rmtree(os.path.join(os.environ['BIST_DATA_DIR'], 'kap'), ignore_errors=True)
+
+    def clear_translations():
+        with translation._db() as db:
+            db.execute('DELETE FROM translations')
+
+    def clear_store():
+        shutil.rmtree(os.path.join(os.environ['BIST_DATA_DIR'], 'ohlcv'), ignore_errors=True)
+
+    cases = {
+        'get_companies': (lambda: app.get_companies(), None),
+        'get_comp_data[cold]': (lambda: app.get_comp_data(SYMBOL), clear_store),
+        'get_comp_data[store]': (lambda: app.get_comp_data(SYMBOL), None),
+        'get_index_data[cold]': (lambda: app.get_index_data(app.BENCHMARK_INDEX), clear_store),
+        'get_index_data[store]': (lambda: app.get_index_data(app.BENCHMARK_INDEX), None),
+        'get_last_price': (lambda: app.get_last_price(SYMBOL), None),
+        'get_company_summary': (lambda: app.get_company_summary(SYMBOL), None),
+        'get_company_info': (lambda: app.get_company_info(SYMBOL), None),
+        'translate_text[cold]': (lambda: app.translate_text('Garanti provides banking products. ' * 20), clear_translations),
+        'translate_text[stored]': (lambda: app.translate_text('Garanti provides banking products. ' * 20), None),
+        'get_company_logo[cold]': (lambda: app.get_company_logo(SYMBOL), clear_kap),
+        'get_company_logo[index]': (lambda: app.get_company_logo(SYMBOL), None),
+        'get_technical_indicators[1hour]': (lambda: app.get_technical_indicators(SYMBOL, '1hour'), None),
+        'get_technical_indicators[daily]': (lambda: app.get_technical_indicators(SYMBOL, 'daily'), None),
+        'get_technical_indicators[weekly]': (lambda: app.get_technical_indicators(SYMBOL, 'weekly'), None),
+        'get_financials': (lambda: app.get_financials(SYMBOL), None),
+        'get_financial_ratios': (lambda: app.get_financial_ratios(SYMBOL), None),
+        'get_last_10_news': (lambda: app.get_last_10_news(SYMBOL), None),
+    }
+
+    results = {}
+    for name, (func, setup) in cases.items():
+        def uncached_setup(setup=setup):
+            cache.CACHE.clear()
+            if setup is not None:
+                setup()
+
+        results[f'fetch/{name}'] = measure(func, 5, uncached_setup)
+        if setup is None:
+            results[f'fetch/{name}[hit]'] = measure(func, 20)
+    return results
+
+
+def view_cases(app):
+    import plotly.graph_objects as go
+
+    import cache
+    import decimate
+    import forecast
+    import prepared
+    import stats
+
+    data0 = app.get_comp_data(SYMBOL)
+    results = {
+        'prepare/prepare_comp_data': measure(lambda: prepared.prepare_comp_data(SYMBOL, data0), 20,
+                                             prepared._frames.clear),
+        'prepare/prepare_comp_data[memo]': measure(lambda: prepared.prepare_comp_data(SYMBOL, data0), 20),
+    }
+    data = prepared.prepare_comp_data(SYMBOL, data0)
+    option = 'Kapanış'
+
+    def clear_memo():
+        stats._memo.clear()
+        forecast._fits.clear()
+
+    for window in WINDOWS:
+        # 2000 days of history hold fewer bars, the slider stops there as well
+        section = min(window, len(data))
+        data2 = data[-section:][option].to_frame(option)
+
+        def moving_averages():
+            frame = data2.copy()
+            frame['1'] = stats.rolling_mean((SYMBOL, option), data[option], 20, section)
+            frame['2'] = stats.rolling_mean((SYMBOL, option), data[option], 100, section)
+            return frame
+
+        def bollinger_figure():
+            rows = decimate.lttb_rows(data2[option], decimate.CHART_POINTS)
+            upper, lower = stats.bollinger_bands((SYMBOL, option), data[option], 7, section)
+            traces = [go.Scatter(x=data2.index[rows], y=data2[option].iloc[rows], mode='lines')]
+            for band in (upper, lower):
+                traces.append(go.Scatter(x=data2.index[rows], y=band.iloc[rows], mode='lines', fill='tonexty'))
+            return go.Figure(traces).to_json()
+
+        def polynomial(degree):
+            return lambda: forecast.polynomial_forecast((SYMBOL, option, section), data2[option], degree, 30)
+
+        candles = data[-section:]
+        cases = {
+            'rolling_mean': (moving_averages, clear_memo),
+            'rolling_mean[memo]': (moving_averages, None),
+            'polynomial[5]': (polynomial(5), clear_memo),
+            'polynomial[20]': (polynomial(20), clear_memo),
+            'polynomial[20][memo]': (polynomial(20), None),
+            'lttb': (lambda: decimate.lttb_frame(data2, option, decimate.CHART_POINTS), None),
+            'figure/bollinger': (bollinger_figure, clear_memo),
+            'figure/candlestick': (lambda: app.candlestick_figure(SYMBOL, decimate.ohlc_buckets(
+                candles, decimate.CHART_POINTS, 'Açılış', 'Yüksek', 'Düşük', 'Kapanış')).to_json(), None),
+            'figure/candlestick[full]': (lambda: app.candlestick_figure(SYMBOL, candles).to_json(), None),
+        }
+        for name, (func, setup) in cases.items():
+            results[f'view/{name}/{window}'] = measure(func, 10, setup)
+
+    cache.CACHE.clear()
+    return results
+
+
+def universe_cases(fixtures):
+    import compare
+    import panel
+    import screener
+    import store
+
+    # the recorded history, scaled and shifted, stands in for every symbol
+    # of a BIST sized universe
+    history = fixtures['historical.pkl']
+    rng = np.random.default_rng(0)
+    symbols = [f'S{i:03d}' for i in range(UNIVERSE_SIZE)]
+    for symbol in symbols:
+        df = history.copy()
+        df[['Open', 'High', 'Low', 'Close']] *= rng.uniform(0.1, 10)
+        store.save_ohlcv(symbol, df.iloc[rng.integers(0, 100):])
+
+    prices = panel.build_panel(symbols)
+    frames = {symbol: store.load_ohlcv(symbol) for symbol in symbols[:COMPARED_SYMBOLS]}
+    frames['index'] = history
+
+    def comparison():
+        returns = compare.log_returns(compare.align(frames, 'Close'))
+        compare.rolling_beta(returns.drop(columns='index'), returns['index'], 60)
+        compare.correlation_matrix(returns, 60)
+
+    return {
+        'screen/build_panel': measure(lambda: panel.build_panel(symbols), 3),
+        'screen/screen': measure(lambda: screener.screen(prices), 20),
+        f'compare/{COMPARED_SYMBOLS}': measure(comparison, 10),
+    }
+
+
+# -- results ------------------------------------------------------------------
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def previous_results(latency):
+    # the last run made with the same stand-in latency
+    try:
+        with open(RESULTS_PATH, encoding='utf-8') as f:
+            runs = [json.loads(line) for line in f if line.strip()]
+    except OSError:
+        return None
+    runs = [run for run in runs if run['latency_ms'] == latency]
+    return runs[-1] if runs else None
+
+
+def report(results, previous):
+    regressions = []
+    for name, ms in results.items():
+        line = f'{name:<50} {ms:10.3f} ms'
+        if previous is not None and name in previous['results']:
+            before = previous['results'][name]
+            change = (ms - before) / before if before else 0.0
+            line += f'   {change:+7.1%}'
+            # sub-millisecond cases are too noisy to flag
+            if change > REGRESSION_THRESHOLD and ms - before > 1:
+                line += '   REGRESSION'
+                regressions.append(name)
+        print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--record', metavar='SYMBOL', help='record fixtures from the live upstreams and exit')
+    parser.add_argument('--latency', type=float, default=0, help='milliseconds added to each stand-in call')
+    parser.add_argument('--no-save', action='store_true', help='do not append the results to results.jsonl')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    if args.record:
+        write_fixtures(recorded_fixtures(args.record))
+        return 0
+
+    if not os.path.isdir(FIXTURE_DIR) or not os.listdir(FIXTURE_DIR):
+        write_fixtures(synthetic_fixtures())
+
+    data_dir = tempfile.mkdtemp(prefix='bist-bench-')
+    os.environ['BIST_DATA_DIR'] = data_dir
+    sys.path.insert(0, ROOT_DIR)
+    try:
+        import main as app
+
+        fixtures = load_fixtures()
+        install_stand_ins(app, fixtures, args.latency / 1000)
+        results = fetcher_cases(app)
+        results.update(view_cases(app))
+        results.update(universe_cases(fixtures))
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    regressions = report(results, previous_results(args.latency))
+
+    if not args.no_save:
+        with open(RESULTS_PATH, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({
+                'time': datetime.now().isoformat(timespec='seconds'),
+                'revision': git_revision(),
+                'python': platform.python_version(),
+                'latency_ms': args.latency,
+                'results': {name: round(ms, 4) for name, ms in results.items()},
+            }) + '\n')
+
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
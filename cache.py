@@ -0,0 +1,173 @@
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import wraps
+
+import pandas as pd
+
+import metrics
+
+
+logger = logging.getLogger(__name__)
+
+MEMORY_BUDGET = int(os.environ.get('BIST_CACHE_MB', '256')) * 1024 * 1024
+
+Entry = namedtuple('Entry', ['value', 'size', 'expires'])
+
+
+def sizeof(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(sizeof(i) for i in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(k) + sizeof(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+
+class Cache:
+    # LRU ordered: the first entry is the least recently used one
+
+    def __init__(self, max_bytes, name):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key, value, ttl):
+        size = sizeof(value)
+        with self.lock:
+            self._pop(key)
+            if size > self.max_bytes:
+                return
+            self.entries[key] = Entry(value, size, time.time() + ttl)
+            self.size += size
+            while self.size > self.max_bytes:
+                self._pop(next(iter(self.entries)))
+                metrics.incr('bist_cache_evictions_total', cache=self.name)
+
+    def clear(self, name=None):
+        with self.lock:
+            for key in [k for k in self.entries if name is None or k[0] == name]:
+                self._pop(key)
+
+    def _pop(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry.size
+        return entry
+
+
+CACHE = Cache(MEMORY_BUDGET, 'fetch')
+
+_refresh_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='cache-refresh')
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def _expiry(ttl, value_ttl, value):
+    return ttl if value_ttl is None else min(ttl, value_ttl(value))
+
+
+def _refresh(key, func, args, kwargs, ttl, value_ttl=None):
+    with _refreshing_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def run():
+        try:
+            value = func(*args, **kwargs)
+            CACHE.set(key, value, _expiry(ttl, value_ttl, value))
+        except Exception:
+            # the stale value keeps being served until the next attempt
+            metrics.incr('bist_cache_refresh_errors_total', function=key[0])
+            logger.warning('Background refresh of %s failed', key[0], exc_info=True)
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(key)
+
+    _refresh_pool.submit(run)
+
+
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+def _fetch_once(key, func, args, kwargs, ttl, value_ttl=None):
+    # single flight: concurrent misses of one key wait for the first caller's
+    # fetch instead of each starting their own
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+        leader = future is None
+        if leader:
+            future = _in_flight[key] = Future()
+
+    if not leader:
+        metrics.incr('bist_cache_requests_total', function=func.__name__, result='coalesced')
+        return future.result()
+
+    metrics.incr('bist_cache_requests_total', function=func.__name__, result='miss')
+    try:
+        value = func(*args, **kwargs)
+        CACHE.set(key, value, _expiry(ttl, value_ttl, value))
+        future.set_result(value)
+        return value
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _in_flight_lock:
+            del _in_flight[key]
+
+
+def cached(ttl, stale=None, value_ttl=None):
+    # ttl is either seconds or a function of the call arguments returning
+    # seconds; value_ttl(value), when given, can shorten it for a particular
+    # result, e.g. an incomplete one. An expired entry is still served for `stale` more seconds
+    # (ttl by default) while it is refreshed in the background; after that
+    # the call blocks on a fresh fetch. The arguments must be hashable.
+
+    def decorator(func):
+        name = f'{func.__module__}.{func.__qualname__}'
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with metrics.span(f'fetch:{func.__name__}'):
+                return lookup(args, kwargs)
+
+        def lookup(args, kwargs):
+            key = (name, args, tuple(sorted(kwargs.items())))
+            entry_ttl = ttl(*args, **kwargs) if callable(ttl) else ttl
+            entry = CACHE.get(key)
+
+            if entry is not None:
+                now = time.time()
+                if now < entry.expires:
+                    metrics.incr('bist_cache_requests_total', function=func.__name__, result='hit')
+                    return entry.value
+                if now < entry.expires + (entry_ttl if stale is None else stale):
+                    metrics.incr('bist_cache_requests_total', function=func.__name__, result='stale')
+                    _refresh(key, func, args, kwargs, entry_ttl, value_ttl)
+                    return entry.value
+
+            return _fetch_once(key, func, args, kwargs, entry_ttl, value_ttl)
+
+        wrapper.clear = lambda: CACHE.clear(name)
+        return wrapper
+
+    return decorator
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+import metrics
+
+
+def align(frames, column):
+    # frames maps a name to a frame with a DatetimeIndex. Their `column` is
+    # written straight into one (dates x names) array on the union of the
+    # dates, then forward filled; no per-symbol reindexed copy is made.
+    names = list(frames)
+    dates = frames[names[0]].index
+    for name in names[1:]:
+        dates = dates.union(frames[name].index)
+
+    values = np.full((len(dates), len(names)), np.nan)
+    for j, name in enumerate(names):
+        df = frames[name]
+        values[dates.get_indexer(df.index), j] = df[column].to_numpy()
+
+    # index of the last valid row at or before each row, per column
+    rows = np.where(np.isnan(values), 0, np.arange(len(dates))[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    values = values[rows, np.arange(len(names))]
+    return pd.DataFrame(values, index=dates, columns=names)
+
+
+def normalized(prices):
+    # every column starts at 100 on its first valid value
+    first = prices.bfill().iloc[0]
+    return 100 * prices / first
+
+
+def log_returns(prices):
+    return np.log(prices).diff().iloc[1:]
+
+
+def _window_sums(values, period):
+    # sums over the trailing `period` rows, from one cumulative sum
+    sums = np.cumsum(values, axis=0)
+    sums[period:] = sums[period:] - sums[:-period]
+    sums[:period - 1] = np.nan
+    return sums
+
+
+def rolling_beta(returns, benchmark, period):
+    # rolling correlation and beta of every column against benchmark in
+    # O(rows x columns): covariances come from windowed sums of x, y, xy, x²
+    # and y² over the rows where both sides have a return. Windows with fewer
+    # than `period` such rows are NaN.
+    with metrics.span('compute:rolling_beta'), np.errstate(invalid='ignore', divide='ignore'):
+        x = returns.to_numpy()
+        y = benchmark.to_numpy()[:, None]
+        valid = ~(np.isnan(x) | np.isnan(y))
+        x, y = np.where(valid, x, 0), np.where(valid, y, 0)
+
+        n = _window_sums(valid.astype(float), period)
+        sx, sy = _window_sums(x, period), _window_sums(y, period)
+        cov = _window_sums(x * y, period) - sx * sy / n
+        var_x = _window_sums(x * x, period) - sx * sx / n
+        var_y = _window_sums(y * y, period) - sy * sy / n
+
+        correlation = cov / np.sqrt(var_x * var_y)
+        beta = cov / var_y
+        # as pandas' rolling(period): only windows without a gap count
+        incomplete = n < period
+        correlation[incomplete] = np.nan
+        beta[incomplete] = np.nan
+    return (
+        pd.DataFrame(correlation, index=returns.index, columns=returns.columns),
+        pd.DataFrame(beta, index=returns.index, columns=returns.columns),
+    )
+
+
+def correlation_matrix(returns, period):
+    # pairwise correlations over the last `period` returns
+    with metrics.span('compute:correlation_matrix'):
+        return returns.iloc[-period:].corr()
@@ -0,0 +1,268 @@
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from functools import wraps
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+import pandas as pd
+
+
+logger = logging.getLogger(__name__)
+
+# BIST_DATA_SERVICE=host:port (or a unix socket path) makes every Streamlit
+# worker forward its fetches to one `python data_service.py` process, which
+# owns the upstream connections and the cache. Unset, everything runs in
+# process as before.
+ADDRESS = os.environ.get('BIST_DATA_SERVICE')
+# shared secret of the service and its workers. Connections carry pickles, so
+# there is no default: without a key the service does not start and workers
+# fetch by themselves.
+AUTHKEY = os.environ.get('BIST_DATA_SERVICE_KEY', '').encode('utf-8') or None
+# frames are published here as .npy files and memory mapped by the workers,
+# so the page cache holds the only copy however many workers there are
+SHM_DIR = os.environ.get(
+    'BIST_SHM_DIR',
+    os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'bist')
+)
+# after a failed connection the worker fetches by itself for this long
+RETRY_AFTER = 30
+# {key}.{version}.{part}.npy, and the temporary files of _write_array
+FRAME_FILE_RE = re.compile(r'.+\.\d+-\d+\.(index|\d+)\.npy(\.tmp\.npy)?')
+
+if ADDRESS and AUTHKEY is None:
+    logger.warning('BIST_DATA_SERVICE is set without BIST_DATA_SERVICE_KEY, fetching in process')
+
+# set in the service process, where the decorated functions run locally
+SERVING = False
+
+_local = threading.local()
+_down_until = 0
+_mapped = {}
+_mapped_lock = threading.Lock()
+_published = {}
+_retired = {}
+_published_lock = threading.Lock()
+
+
+class ServiceUnavailable(Exception):
+    pass
+
+
+def _address():
+    host, sep, port = ADDRESS.rpartition(':')
+    if sep and port.isdigit():
+        return host or '127.0.0.1', int(port)
+    return ADDRESS
+
+
+def _connection():
+    # one connection per thread, the prefetch pool calls concurrently
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = _local.conn = Client(_address(), authkey=AUTHKEY)
+    return conn
+
+
+def _call(name, args, kwargs, retry=True):
+    try:
+        conn = _connection()
+        conn.send((name, args, kwargs))
+        status, value = conn.recv()
+    except (OSError, EOFError) as e:
+        _local.conn = None
+        raise ServiceUnavailable(f'data service at {ADDRESS} is unreachable') from e
+
+    if status == 'error':
+        raise value
+    if status == 'frame':
+        try:
+            return _map_frame(value)
+        except FileNotFoundError:
+            # two newer versions were published since the reply, ask again
+            if not retry:
+                raise
+            return _call(name, args, kwargs, retry=False)
+    return value
+
+
+def remote(shared_memory=False):
+    # Runs the decorated fetcher in the data service. shared_memory=True is
+    # for large numeric frames: they are passed as memory mapped files instead
+    # of being pickled through the socket. Goes outside @cached, so that the
+    # only cache is the service's.
+
+    def decorator(func):
+        if not ADDRESS or AUTHKEY is None:
+            return func
+        name = func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            global _down_until
+            if SERVING:
+                return func(*args, **kwargs)
+            if time.time() >= _down_until:
+                try:
+                    return _call(name, args, kwargs)
+                except ServiceUnavailable:
+                    _down_until = time.time() + RETRY_AFTER
+                    logger.warning('Data service is down, fetching %s locally', name, exc_info=True)
+            return func(*args, **kwargs)
+
+        wrapper.remote = True
+        wrapper.shared_memory = shared_memory
+        return wrapper
+
+    return decorator
+
+
+def _frame_path(key, version, part):
+    return os.path.join(SHM_DIR, f'{key}.{version}.{part}.npy')
+
+
+def _runs(df):
+    # consecutive columns of one numeric dtype are stored together, constant
+    # non-numeric columns (the currency) travel in the descriptor
+    runs = []
+    for column, dtype in df.dtypes.items():
+        if dtype.kind in 'iufb':
+            if runs and runs[-1][0] == dtype.name:
+                runs[-1][1].append(column)
+            else:
+                runs.append((dtype.name, [column]))
+            continue
+        values = df[column].unique()
+        if len(values) > 1:
+            raise ValueError(f'column {column} is neither numeric nor constant')
+        runs.append((None, [column, values[0] if len(values) else None]))
+    return runs
+
+
+def publish_frame(key, df):
+    # Every version of a frame gets new files. The previous version's stay
+    # until the next publish, for workers that were just sent its descriptor;
+    # older ones are unlinked, which leaves the mappings workers still hold
+    # intact.
+    with _published_lock:
+        previous = _published.get(key)
+        if previous is not None and (previous[0] is df or previous[0].equals(df)):
+            return previous[1]
+
+        os.makedirs(SHM_DIR, exist_ok=True)
+        version = f'{os.getpid()}-{time.time_ns()}'
+        runs = _runs(df)
+        _write_array(_frame_path(key, version, 'index'), df.index.values)
+        for i, (dtype, columns) in enumerate(runs):
+            if dtype is not None:
+                _write_array(_frame_path(key, version, i), df[columns].to_numpy())
+
+        descriptor = {'key': key, 'version': version, 'index_name': df.index.name, 'runs': runs}
+        if key in _retired:
+            _unlink_frame(_retired.pop(key))
+        if previous is not None:
+            _retired[key] = previous[1]
+        _published[key] = (df, descriptor)
+        return descriptor
+
+
+def _write_array(path, values):
+    # np.save appends .npy to the name it is given
+    tmp_path = f'{path}.tmp'
+    np.save(tmp_path, np.ascontiguousarray(values), allow_pickle=False)
+    os.replace(f'{tmp_path}.npy', path)
+
+
+def _unlink_frame(descriptor):
+    parts = ['index'] + [i for i, (dtype, _) in enumerate(descriptor['runs']) if dtype is not None]
+    for part in parts:
+        try:
+            os.remove(_frame_path(descriptor['key'], descriptor['version'], part))
+        except FileNotFoundError:
+            pass
+
+
+def _map_frame(descriptor):
+    # the returned frame reads straight from the mapped files and is read only
+    key, version = descriptor['key'], descriptor['version']
+    with _mapped_lock:
+        mapped = _mapped.get(key)
+        if mapped is not None and mapped[0] == version:
+            return mapped[1]
+
+    index = pd.Index(np.load(_frame_path(key, version, 'index'), mmap_mode='r'),
+                     copy=False, name=descriptor['index_name'])
+    frames = []
+    for i, (dtype, columns) in enumerate(descriptor['runs']):
+        if dtype is None:
+            column, value = columns
+            frames.append(pd.DataFrame({column: value}, index=index))
+        else:
+            values = np.load(_frame_path(key, version, i), mmap_mode='r')
+            frames.append(pd.DataFrame(values, index=index, columns=columns, copy=False))
+    df = pd.concat(frames, axis=1, copy=False) if len(frames) > 1 else frames[0]
+
+    with _mapped_lock:
+        _mapped[key] = (version, df)
+    return df
+
+
+def _handle(conn, app):
+    while True:
+        try:
+            name, args, kwargs = conn.recv()
+        except (EOFError, OSError):
+            return
+        # only the fetchers marked with @remote are callable from outside
+        func = getattr(app, name, None) if isinstance(name, str) else None
+        try:
+            if not getattr(func, 'remote', False):
+                logger.warning('Refused a call of %r', name)
+                raise AttributeError(f'{name!r} is not a remote function')
+            value = func(*args, **kwargs)
+            if func.shared_memory:
+                key = '-'.join([name] + [str(a) for a in args])
+                reply = ('frame', publish_frame(key, value))
+            else:
+                reply = ('ok', value)
+        except Exception as e:
+            reply = ('error', e)
+        try:
+            conn.send(reply)
+        except (OSError, EOFError):
+            return
+
+
+def serve():
+    global SERVING
+    SERVING = True
+    import main as app
+
+    # frames an earlier service left behind are not referenced any more; the
+    # directory may be shared, so only its frame files are removed
+    if os.path.isdir(SHM_DIR):
+        for name in os.listdir(SHM_DIR):
+            path = os.path.join(SHM_DIR, name)
+            if FRAME_FILE_RE.fullmatch(name) and os.path.isfile(path):
+                os.remove(path)
+
+    with Listener(_address(), authkey=AUTHKEY) as listener:
+        logger.info('Data service listening on %s', ADDRESS)
+        while True:
+            conn = listener.accept()
+            threading.Thread(target=_handle, args=(conn, app), daemon=True).start()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    if not ADDRESS:
+        raise SystemExit('BIST_DATA_SERVICE is not set')
+    if AUTHKEY is None:
+        raise SystemExit('BIST_DATA_SERVICE_KEY is not set')
+    # main imports this file as data_service, serve that module and not
+    # __main__ so that main sees SERVING
+    import data_service
+    data_service.serve()
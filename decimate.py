@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+
+# about the width in pixels of a wide layout chart
+CHART_POINTS = 800
+
+
+def lttb_rows(series, threshold):
+    # positions of the rows kept by Largest-Triangle-Three-Buckets. Rows
+    # where the series is missing (e.g. forecast days) are always kept.
+    values = series.values.astype(float)
+    valid = np.flatnonzero(~np.isnan(values))
+    n = len(valid)
+    if threshold is None or threshold < 3 or n <= threshold:
+        return np.arange(len(values))
+
+    x = valid.astype(float)
+    y = values[valid]
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0] = 0
+    kept[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        kept[i + 1] = a
+
+    return np.union1d(valid[kept], np.flatnonzero(np.isnan(values)))
+
+
+def lttb_frame(df, column, threshold):
+    return df.iloc[lttb_rows(df[column], threshold)]
+
+
+def even_rows(df, threshold):
+    # for frames of many columns, where no single column can choose the rows
+    n = len(df)
+    if threshold is None or n <= threshold:
+        return df
+    return df.iloc[np.linspace(0, n - 1, threshold).astype(int)]
+
+
+def ohlc_buckets(df, threshold, open_col, high_col, low_col, close_col):
+    # merges consecutive candles into `threshold` candles of equal row count
+    n = len(df)
+    if threshold is None or n <= threshold:
+        return df
+
+    starts = np.linspace(0, n, threshold, endpoint=False).astype(int)
+    ends = np.append(starts[1:], n) - 1
+    return pd.DataFrame({
+        open_col: df[open_col].values[starts],
+        high_col: np.maximum.reduceat(df[high_col].values, starts),
+        low_col: np.minimum.reduceat(df[low_col].values, starts),
+        close_col: df[close_col].values[ends],
+    }, index=df.index[starts])
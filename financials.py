@@ -0,0 +1,57 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+
+SUMMARY_TYPES = ['income_statement', 'cash_flow_statement', 'balance_sheet']
+PERIODS = ['annual', 'quarterly']
+KEYS = ['summary_type', 'period', 'Date', 'item']
+
+# statements is one long table with a row per (summary_type, period, Date,
+# item) and a value column; dividends is the dividend history; failed lists
+# the parts that could not be downloaded
+Financials = namedtuple('Financials', ['statements', 'dividends', 'failed'])
+
+
+def statements_table(summaries):
+    # summaries maps (summary_type, period) to investpy's wide summary frame
+    # (dates x items). Key columns are categoricals, so the table stays small
+    # and items keep their original order.
+    if not summaries:
+        return pd.DataFrame({'value': []}, index=pd.MultiIndex.from_arrays([[]] * len(KEYS), names=KEYS))
+    long = pd.concat(
+        {key: df.rename_axis(index='Date', columns='item').stack() for key, df in summaries.items()},
+        names=KEYS[:2]
+    ).to_frame('value')
+    items = pd.unique(np.concatenate([df.columns.to_numpy() for df in summaries.values()]))
+    return long.reset_index().astype({
+        'summary_type': 'category',
+        'period': 'category',
+        'item': pd.CategoricalDtype(items),
+    }).set_index(KEYS).sort_index()
+
+
+def statement(statements, summary_type, period):
+    # one summary back in investpy's shape, or None when it was not available
+    try:
+        rows = statements.xs((summary_type, period), level=('summary_type', 'period'))
+    except KeyError:
+        return None
+    table = rows['value'].unstack('item')
+    table = table.loc[:, table.notna().any()]
+    table.columns = table.columns.astype(str)
+    return table.sort_index()
+
+
+def abbreviate_types(types):
+    # 'trailing_twelve_months' -> 'TTM'; each distinct type is abbreviated
+    # once and mapped back to the rows, a missing type stays missing
+    uniques = types.dropna().unique()
+    return types.map({t: ''.join(word[0].upper() for word in t.split('_')) for t in uniques})
+
+
+def dividends_table(dividends):
+    df = dividends.set_index('Payment Date').drop(columns='Date')
+    df['Type'] = abbreviate_types(df['Type'])
+    return df
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+import metrics
+import store
+from cache import Cache
+
+
+# fitted polynomials per (series, degree), shared by all sessions of the process
+_fits = Cache(16 * 1024 * 1024, 'forecast')
+FIT_TTL = 60 * 60
+
+
+def polynomial_fit(key, values, degree):
+    # key names the fitted window, e.g. (symbol, column, section); its version
+    # is part of the memo key, so new or updated bars are refitted
+    memo_key = (key, degree, store.version(values))
+    entry = _fits.get(memo_key)
+    if entry is not None:
+        return entry.value
+
+    # a Chebyshev series fitted on x mapped into [-1, 1] stays well conditioned
+    # up to high degrees, unlike np.polyfit on raw x values up to 2000
+    with metrics.span('compute:polynomial_fit'):
+        fit = np.polynomial.Chebyshev.fit(np.arange(len(values)), values.values, degree)
+    _fits.set(memo_key, fit, FIT_TTL)
+    return fit
+
+
+def polynomial_forecast(key, values, degree, days):
+    fit = polynomial_fit(key, values, degree)
+    future = pd.date_range(values.index[-1] + pd.Timedelta(days=1), periods=days, freq='D')
+    return pd.Series(fit(np.arange(len(values) + days)), index=values.index.append(future))
@@ -0,0 +1,94 @@
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import metrics
+
+
+# (connect, read) seconds, so a slow upstream cannot hold a script run forever
+TIMEOUT = (3.05, 10)
+RETRY = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504))
+# bodies kept to answer 304 Not Modified responses
+MAX_VALIDATED_PAGES = 128
+
+_lock = threading.Lock()
+_session = None
+_validated = OrderedDict()
+_latency = {}
+
+
+def session():
+    global _session
+    with _lock:
+        if _session is None:
+            # one keep-alive pool per host, shared by every thread
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=RETRY)
+            _session = requests.Session()
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+        return _session
+
+
+def _record_latency(host, seconds):
+    metrics.observe('bist_http_seconds', seconds, host=host)
+    with _lock:
+        count, total, slowest = _latency.get(host, (0, 0.0, 0.0))
+        _latency[host] = (count + 1, total + seconds, max(slowest, seconds))
+
+
+def latency_report():
+    with _lock:
+        rows = {host: (count, 1000 * total / count, 1000 * slowest)
+                for host, (count, total, slowest) in _latency.items()}
+    return pd.DataFrame.from_dict(rows, orient='index', columns=['İstek', 'Ortalama (ms)', 'En Yavaş (ms)'])
+
+
+def get(url, timeout=TIMEOUT):
+    # returns the body of url, asking the server whether the copy from the
+    # previous call is still valid (ETag / Last-Modified) when there is one
+    with _lock:
+        validated = _validated.get(url)
+
+    headers = {}
+    if validated is not None:
+        etag, last_modified, _ = validated
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+    host = urlsplit(url).netloc
+    start = time.perf_counter()
+    try:
+        response = session().get(url, headers=headers, timeout=timeout)
+    except requests.RequestException:
+        metrics.incr('bist_http_errors_total', host=host)
+        raise
+    finally:
+        _record_latency(host, time.perf_counter() - start)
+
+    if response.status_code == 304 and validated is not None:
+        with _lock:
+            _validated.move_to_end(url)
+        return validated[2]
+
+    if response.status_code >= 400:
+        metrics.incr('bist_http_errors_total', host=host)
+    response.raise_for_status()
+
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+    if etag or last_modified:
+        with _lock:
+            _validated[url] = (etag, last_modified, response.content)
+            _validated.move_to_end(url)
+            while len(_validated) > MAX_VALIDATED_PAGES:
+                _validated.popitem(last=False)
+
+    return response.content
@@ -0,0 +1,230 @@
+import numpy as np
+import pandas as pd
+
+
+# intervals that can be computed from the stored daily bars. Monthly is not:
+# store.HISTORY_DAYS gives only about 66 monthly bars, too few for the
+# smoothing below to settle, so it stays with investpy.
+LOCAL_INTERVALS = ('daily', 'weekly')
+
+RESAMPLE_RULES = {
+    'daily': None,
+    'weekly': 'W-FRI',
+}
+
+# Only the last WINDOW bars are used. The longest smoothing is a 26 bar EMA
+# and a 14 bar Wilder average, both forget their starting point to below
+# 1e-8 within 250 bars, so with at least that many bars stored (about 1370
+# daily and 285 weekly ones) the result equals the one over the whole history,
+# while a new bar costs the same no matter how long the history is.
+WINDOW = 250
+
+BAR_AGG = {
+    'Open': 'first',
+    'High': 'max',
+    'Low': 'min',
+    'Close': 'last',
+    'Volume': 'sum',
+}
+
+OSCILLATOR_LABELS = ['overbought', 'buy', 'neutral', 'sell', 'oversold']
+
+# value > thresholds[i] gives labels[i], a value below all of them the last label
+SIGNAL_RULES = {
+    'RSI(14)': ([70, 55, 45, 30], OSCILLATOR_LABELS),
+    'STOCH(9,6)': ([80, 55, 45, 20], OSCILLATOR_LABELS),
+    'STOCHRSI(14)': ([80, 55, 45, 20], OSCILLATOR_LABELS),
+    'MACD(12,26)': ([0], ['buy', 'sell']),
+    'ADX(14)': ([0.5, -0.5], ['buy', 'neutral', 'sell']),
+    'Williams %R': ([-20, -45, -55, -80], OSCILLATOR_LABELS),
+    'CCI(14)': ([200, 100, -100, -200], OSCILLATOR_LABELS),
+    'ATR(14)': ([1], ['high_volatility', 'less_volatility']),
+    'Highs/Lows(14)': ([0], ['buy', 'sell']),
+    'Ultimate Oscillator': ([70, 55, 45, 30], OSCILLATOR_LABELS),
+    'ROC': ([0], ['buy', 'sell']),
+    'Bull/Bear Power(13)': ([0], ['buy', 'sell']),
+}
+
+
+def resample(bars, interval):
+    rule = RESAMPLE_RULES[interval]
+    if rule is None:
+        return bars
+    agg = {column: how for column, how in BAR_AGG.items() if column in bars.columns}
+    return bars.resample(rule).agg(agg).dropna(subset=['Close'])
+
+
+def tail(bars, interval):
+    if interval == 'daily':
+        return bars.iloc[-WINDOW:]
+    # resampling only what the window needs keeps weekly updates cheap too
+    return resample(bars.loc[bars.index[-1] - pd.Timedelta(weeks=WINDOW):], interval).iloc[-WINDOW:]
+
+
+def sma(x, n):
+    return x.rolling(n).mean()
+
+
+def ema(x, n):
+    return x.ewm(span=n, adjust=False).mean()
+
+
+def wilder(x, n):
+    return x.ewm(alpha=1 / n, adjust=False).mean()
+
+
+def true_range(high, low, close):
+    prev_close = close.shift(1)
+    return np.maximum(high - low, np.maximum((high - prev_close).abs(), (low - prev_close).abs()))
+
+
+def mean_deviation(x, n):
+    rows = np.ascontiguousarray(x.values, dtype=float)
+    out = np.full(rows.shape, np.nan)
+    if len(rows) >= n:
+        stride_row, stride_col = rows.strides
+        windows = np.lib.stride_tricks.as_strided(
+            rows,
+            shape=(len(rows) - n + 1, n, rows.shape[1]),
+            strides=(stride_row, stride_row, stride_col),
+            writeable=False
+        )
+        out[n - 1:] = np.abs(windows - windows.mean(axis=1, keepdims=True)).mean(axis=1)
+    return pd.DataFrame(out, index=x.index, columns=x.columns)
+
+
+def rsi(close, n=14):
+    diff = close.diff()
+    gain = wilder(diff.clip(lower=0), n)
+    loss = wilder(-diff.clip(upper=0), n)
+    return 100 - 100 / (1 + gain / loss)
+
+
+def stoch(high, low, close, k=9, d=6):
+    lowest = low.rolling(k).min()
+    highest = high.rolling(k).max()
+    return sma(100 * (close - lowest) / (highest - lowest), d)
+
+
+def stoch_rsi(close, n=14):
+    r = rsi(close, n)
+    lowest = r.rolling(n).min()
+    return 100 * (r - lowest) / (r.rolling(n).max() - lowest)
+
+
+def macd(close, fast=12, slow=26):
+    return ema(close, fast) - ema(close, slow)
+
+
+def directional(high, low, close, n=14):
+    up = high.diff()
+    down = -low.diff()
+    plus_dm = up.where((up > down) & (up > 0), 0.0)
+    minus_dm = down.where((down > up) & (down > 0), 0.0)
+    atr_ = wilder(true_range(high, low, close), n)
+    plus_di = 100 * wilder(plus_dm, n) / atr_
+    minus_di = 100 * wilder(minus_dm, n) / atr_
+    adx_ = wilder(100 * (plus_di - minus_di).abs() / (plus_di + minus_di), n)
+    return adx_, plus_di, minus_di
+
+
+def williams_r(high, low, close, n=14):
+    highest = high.rolling(n).max()
+    return -100 * (highest - close) / (highest - low.rolling(n).min())
+
+
+def cci(high, low, close, n=14):
+    typical = (high + low + close) / 3
+    return (typical - sma(typical, n)) / (0.015 * mean_deviation(typical, n))
+
+
+def atr(high, low, close, n=14):
+    return wilder(true_range(high, low, close), n)
+
+
+def highs_lows(high, low, n=14):
+    new_highs = (high - high.shift(1)).clip(lower=0)
+    new_lows = (low.shift(1) - low).clip(lower=0)
+    return sma(new_highs - new_lows, n)
+
+
+def ultimate_oscillator(high, low, close, short=7, medium=14, long=28):
+    prev_close = close.shift(1)
+    floor = np.minimum(low, prev_close)
+    buying_pressure = close - floor
+    ranges = np.maximum(high, prev_close) - floor
+
+    def average(n):
+        return buying_pressure.rolling(n).sum() / ranges.rolling(n).sum()
+
+    return 100 * (4 * average(short) + 2 * average(medium) + average(long)) / 7
+
+
+def roc(close, n=12):
+    return 100 * (close / close.shift(n) - 1)
+
+
+def bull_bear_power(high, low, close, n=13):
+    average = ema(close, n)
+    return (high - average) + (low - average)
+
+
+def signal(name, values):
+    thresholds, labels = SIGNAL_RULES[name]
+    values = np.asarray(values, dtype=float)
+    conditions = [values > t for t in thresholds]
+    labels_out = np.select(conditions, labels[:-1], default=labels[-1]).astype(object)
+    labels_out[np.isnan(values)] = 'neutral'
+    return labels_out
+
+
+def latest(high, low, close):
+    # high, low and close are DataFrames with one column per symbol. Returns
+    # the last value and signal input of every indicator, indicators x symbols.
+    adx_, plus_di, minus_di = directional(high, low, close)
+    atr_ = atr(high, low, close)
+
+    series = {
+        'RSI(14)': rsi(close),
+        'STOCH(9,6)': stoch(high, low, close),
+        'STOCHRSI(14)': stoch_rsi(close),
+        'MACD(12,26)': macd(close),
+        'ADX(14)': adx_,
+        'Williams %R': williams_r(high, low, close),
+        'CCI(14)': cci(high, low, close),
+        'ATR(14)': atr_,
+        'Highs/Lows(14)': highs_lows(high, low),
+        'Ultimate Oscillator': ultimate_oscillator(high, low, close),
+        'ROC': roc(close),
+        'Bull/Bear Power(13)': bull_bear_power(high, low, close),
+    }
+    values = pd.DataFrame({name: s.iloc[-1] for name, s in series.items()}).T
+
+    signal_inputs = values.copy()
+    trend = np.sign(plus_di.iloc[-1] - minus_di.iloc[-1])
+    signal_inputs.loc['ADX(14)'] = trend.where(adx_.iloc[-1] > 25, 0.0)
+    signal_inputs.loc['ATR(14)'] = atr_.iloc[-1] / sma(atr_, 14).iloc[-1]
+    return values, signal_inputs
+
+
+def technical_indicators_table(high, low, close):
+    # values and signals of every indicator, indicators x symbols
+    values, signal_inputs = latest(high, low, close)
+    signals = pd.DataFrame(
+        [signal(name, signal_inputs.loc[name].values) for name in values.index],
+        index=values.index,
+        columns=values.columns
+    )
+    return values.round(3), signals
+
+
+def technical_indicators(bars, interval):
+    # the same layout investpy.technical_indicators returns, from local bars
+    bars = tail(bars.dropna(subset=['High', 'Low', 'Close']), interval)
+    high, low, close = (bars[column].to_frame('value') for column in ['High', 'Low', 'Close'])
+    values, signals = technical_indicators_table(high, low, close)
+    return pd.DataFrame({
+        'technical_indicator': values.index,
+        'value': values['value'].values,
+        'signal': signals['value'].values,
+    })
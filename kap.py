@@ -0,0 +1,134 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+import http_client
+import parsing
+from store import DATA_DIR
+from upstream import limited
+
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = 'https://www.kap.org.tr'
+INDEX_PATH = os.path.join(DATA_DIR, 'kap', 'index.json')
+LOGO_DIR = os.path.join(DATA_DIR, 'kap', 'logos')
+LISTING_MAX_AGE = 24 * 60 * 60
+
+# link texts of the listing look like 'GARAN' or 'ISCTR, ISATR, ISBTR'
+SYMBOLS_RE = re.compile(r'[A-Z0-9]+(?:\s*,\s*[A-Z0-9]+)*')
+
+_lock = threading.RLock()
+_index = None
+_crawler = None
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+@limited('kap')
+def _get(url):
+    # every request to KAP goes through the kap limits; index and disk hits
+    # take no token
+    return http_client.get(url)
+
+
+def load_index():
+    global _index
+    with _lock:
+        if _index is None:
+            try:
+                with open(INDEX_PATH, encoding='utf-8') as f:
+                    _index = json.load(f)
+            except (OSError, ValueError):
+                _index = {'listed_at': 0, 'pages': {}, 'logos': {}}
+        return _index
+
+
+def _save_index():
+    with _lock:
+        data = json.dumps(_index, ensure_ascii=False, indent=1).encode('utf-8')
+    _write_atomic(INDEX_PATH, data)
+
+
+def parse_listing(page):
+    pages = {}
+    for a in parsing.LINKS(parsing.document(page)):
+        text = parsing.text(a).strip()
+        if SYMBOLS_RE.fullmatch(text):
+            for symbol in re.split(r'\s*,\s*', text):
+                pages.setdefault(symbol, a.get('href'))
+    return pages
+
+
+def parse_logo_url(page):
+    return BASE_URL + parsing.LOGO_SRC(parsing.document(page))[0]
+
+
+def crawl_listing():
+    page = _get(f'{BASE_URL}/tr/bist-sirketler')
+    pages = parse_listing(page)
+    index = load_index()
+    with _lock:
+        index['pages'].update(pages)
+        index['listed_at'] = time.time()
+    _save_index()
+
+
+def get_logo_url(symbol):
+    index = load_index()
+    if symbol in index['logos']:
+        return index['logos'][symbol]
+
+    # a symbol missing from a fresh listing is not on KAP, do not crawl again
+    if symbol not in index['pages'] and time.time() - index['listed_at'] > LISTING_MAX_AGE:
+        crawl_listing()
+    href = index['pages'][symbol]
+
+    logo_url = parse_logo_url(_get(BASE_URL + href))
+    with _lock:
+        index['logos'][symbol] = logo_url
+    _save_index()
+    return logo_url
+
+
+def get_logo(symbol):
+    path = os.path.join(LOGO_DIR, symbol)
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except OSError:
+        pass
+
+    logo = _get(get_logo_url(symbol))
+    _write_atomic(path, logo)
+    return logo
+
+
+def _crawl(symbols):
+    # its requests share the kap limits with the sessions' logo fetches
+    for symbol in symbols:
+        if os.path.exists(os.path.join(LOGO_DIR, symbol)):
+            continue
+        try:
+            get_logo(symbol)
+        except Exception:
+            logger.info('No KAP logo for %s', symbol, exc_info=True)
+
+
+def start_crawl(symbols):
+    # resolves every logo once in the background, so that switching symbols
+    # is served from the local index and logo files
+    global _crawler
+    with _lock:
+        if _crawler is None:
+            _crawler = threading.Thread(target=_crawl, args=(list(symbols),), name='kap-crawler', daemon=True)
+            _crawler.start()
@@ -0,0 +1,23 @@
+import importlib
+
+
+class LazyModule:
+    # stands in for a module until one of its attributes is first used, so a
+    # heavy import is paid by the panel that needs it and not at startup
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            # importlib holds a per-module lock, concurrent first uses are safe
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        return f'<lazy module {self._name!r}>'
+
+
+def module(name):
+    return LazyModule(name)
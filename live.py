@@ -0,0 +1,174 @@
+import logging
+import math
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import pandas as pd
+
+import metrics
+
+
+logger = logging.getLogger(__name__)
+
+POLL_SECONDS = 30
+# longest a session blocks in Feed.wait, it must stay responsive to reruns
+WAIT_SECONDS = 1
+# a feed nobody has read for this long stops polling
+IDLE_SECONDS = 10 * 60
+INTERVALS = {
+    '5mins': 5 * 60,
+    '15mins': 15 * 60,
+    '30mins': 30 * 60,
+    '1hour': 60 * 60,
+}
+MAX_BARS = 500
+# rolling mean and bands over this many closed bars
+PERIOD = 20
+BAND_WIDTH = 2
+
+COLUMNS = ['Kapanış', 'Yürüyen Ortalama', 'Üst Sınır', 'Alt Sınır']
+
+_feeds = {}
+_feeds_lock = threading.Lock()
+
+
+class RollingWindow:
+    # mean and standard deviation of the last `period` values in O(1) per
+    # value, from running sums
+
+    def __init__(self, period):
+        self.period = period
+        self.values = deque()
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def add(self, value):
+        self.values.append(value)
+        self.total += value
+        self.total_sq += value * value
+        if len(self.values) > self.period:
+            old = self.values.popleft()
+            self.total -= old
+            self.total_sq -= old * old
+
+    def mean(self):
+        if len(self.values) < self.period:
+            return math.nan
+        return self.total / self.period
+
+    def std(self):
+        # sample deviation, as pandas' rolling().std()
+        n = len(self.values)
+        if n < self.period or n < 2:
+            return math.nan
+        variance = (self.total_sq - self.total * self.total / n) / (n - 1)
+        return math.sqrt(max(variance, 0.0))
+
+
+class LiveBars:
+    # closed bars of one interval, with the rolling columns computed once when
+    # the bar closes, and the bar still being built
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.rows = deque(maxlen=MAX_BARS)
+        self.window = RollingWindow(PERIOD)
+        self.current = None
+
+    def add(self, when, price):
+        start = datetime.fromtimestamp(when.timestamp() // self.seconds * self.seconds)
+        if self.current is not None and self.current[0] != start:
+            self._close()
+        if self.current is None:
+            self.current = [start, price, price, price, price]
+        else:
+            bar = self.current
+            bar[2] = max(bar[2], price)
+            bar[3] = min(bar[3], price)
+            bar[4] = price
+
+    def _close(self):
+        start, _, _, _, close = self.current
+        self.window.add(close)
+        mean, band = self.window.mean(), self.window.std() * BAND_WIDTH
+        self.rows.append((start, close, mean, mean + band, mean - band))
+        self.current = None
+
+
+class Feed:
+    # polls one symbol for every session watching it and keeps its bars
+
+    def __init__(self, symbol, fetch):
+        self.symbol = symbol
+        self.fetch = fetch
+        self.bars = {interval: LiveBars(seconds) for interval, seconds in INTERVALS.items()}
+        self.condition = threading.Condition()
+        self.version = 0
+        self.read_at = time.time()
+
+    def run(self):
+        while True:
+            # checked under the lock subscribe() refreshes read_at with, so a
+            # feed is never handed out as it stops
+            with _feeds_lock:
+                if time.time() - self.read_at >= IDLE_SECONDS:
+                    del _feeds[self.symbol]
+                    return
+
+            try:
+                price = self.fetch(self.symbol)
+            except Exception:
+                metrics.incr('bist_live_poll_errors_total')
+                logger.warning('Live poll of %s failed', self.symbol, exc_info=True)
+                price = None
+
+            if price is not None:
+                now = datetime.now()
+                with self.condition:
+                    for bars in self.bars.values():
+                        bars.add(now, price)
+                    self.version += 1
+                    self.condition.notify_all()
+            time.sleep(POLL_SECONDS)
+
+    def wait(self, version, timeout=WAIT_SECONDS):
+        # blocks until a poll newer than `version` arrives or the timeout
+        # passes, and returns the current version
+        with self.condition:
+            self.read_at = time.time()
+            self.condition.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def frame(self, interval, after=None):
+        # closed bars only, those later than `after` if given
+        rows = []
+        with self.condition:
+            self.read_at = time.time()
+            # walked from the end, so a poll only touches the new bars
+            for row in reversed(self.bars[interval].rows):
+                if after is not None and row[0] <= after:
+                    break
+                rows.append(row)
+        rows.reverse()
+        return pd.DataFrame([row[1:] for row in rows], index=[row[0] for row in rows], columns=COLUMNS)
+
+    def current(self, interval):
+        with self.condition:
+            bar = self.bars[interval].current
+            if bar is None:
+                return None
+            return pd.Series(bar[1:], index=['Açılış', 'Yüksek', 'Düşük', 'Son'], name=bar[0])
+
+
+def subscribe(symbol, fetch):
+    # fetch(symbol) returns the last price, or None when there is none (market
+    # closed). Sessions on the same symbol share one feed and its polling.
+    with _feeds_lock:
+        feed = _feeds.get(symbol)
+        if feed is None:
+            feed = _feeds[symbol] = Feed(symbol, fetch)
+            threading.Thread(target=feed.run, name=f'live-{symbol}', daemon=True).start()
+        feed.read_at = time.time()
+        return feed
@@ -1,12 +1,38 @@
-import investpy as inp
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+import logging
 import streamlit as st
-from googletrans import Translator
-import plotly.graph_objects as go
-import numpy as np
 import pandas as pd
-import requests
-from bs4 import BeautifulSoup
+
+import compare
+import decimate
+import financials
+import forecast
+import indicators
+import lazy
+import live
+import metrics
+import panel
+import prepared
+import screener
+import snapshot
+import stats
+import store
+import translation
+import upstream
+from cache import cached
+from data_service import remote
+from upstream import limited, prefetch
+
+logger=logging.getLogger(__name__)
+
+# imported on first use: investpy by the first fetch, plotly by the first
+# plotly chart and the scraping stack by the first logo, ratio or news fetch
+inp = lazy.module('investpy')
+go = lazy.module('plotly.graph_objects')
+http_client = lazy.module('http_client')
+kap = lazy.module('kap')
+parsing = lazy.module('parsing')
   
 
 
@@ -17,110 +43,313 @@ st.set_page_config(
     initial_sidebar_state='auto'
 )
 
+MINUTE=60
+HOUR=60*MINUTE
+DAY=24*HOUR
+
+BENCHMARK_INDEX='BIST 100'
+# the comparison page fetches dozens of histories at once; they wait for
+# investpy tokens on these threads, not on the shared prefetch pool
+COMPARISON_POOL=ThreadPoolExecutor(max_workers=upstream.CONCURRENCY['investpy'],thread_name_prefix='comparison')
+# the downloads of one company's financials, for the same reason
+FINANCIALS_POOL=ThreadPoolExecutor(max_workers=upstream.CONCURRENCY['investpy'],thread_name_prefix='financials')
+
+INDICATOR_TTL={
+    '5mins':MINUTE,
+    '15mins':3*MINUTE,
+    '30mins':5*MINUTE,
+    '1hour':10*MINUTE,
+    '5hours':30*MINUTE,
+    'daily':HOUR,
+    'weekly':6*HOUR,
+    'monthly':DAY
+}
 
 
-@st.cache
+
+@remote()
+@cached(ttl=DAY)
 def get_companies():
-    companies=inp.get_stocks(country='turkey')
-    companies.columns=['Ülke','Kısa İsim','Şirket','ISIN','Para Birimi','Sembol']
-    companies=companies.set_index('Sembol')
+    companies=snapshot.load_companies()
+    if companies is None:
+        companies=snapshot.download_companies()
+        snapshot.save_companies(companies)
     return companies
 
-@st.cache()
+@remote(shared_memory=True)
+@cached(ttl=15*MINUTE)
+@limited('investpy')
 def get_comp_data(symbol):
-    end_date=datetime.now()
-    start_date=end_date-timedelta(days=2000)
-    
-    df = inp.get_stock_historical_data(
-        stock=symbol, 
-        country='turkey', 
-        from_date=start_date.strftime('%d/%m/%Y'), 
-        to_date=end_date.strftime('%d/%m/%Y'), 
-        as_json=False, 
-        order='ascending'
-    )
-    return df
+    def download(start_date, end_date):
+        return inp.get_stock_historical_data(
+            stock=symbol, 
+            country='turkey', 
+            from_date=start_date.strftime('%d/%m/%Y'), 
+            to_date=end_date.strftime('%d/%m/%Y'), 
+            as_json=False, 
+            order='ascending'
+        )
+
+    return store.update_ohlcv(symbol, download)
+
+@remote(shared_memory=True)
+@cached(ttl=15*MINUTE)
+@limited('investpy')
+def get_index_data(index):
+    def download(start_date, end_date):
+        return inp.get_index_historical_data(
+            index=index,
+            country='turkey',
+            from_date=start_date.strftime('%d/%m/%Y'),
+            to_date=end_date.strftime('%d/%m/%Y'),
+            as_json=False,
+            order='ascending'
+        )
 
-@st.cache()
+    return store.update_ohlcv(index, download)
+
+@remote()
+@cached(ttl=live.POLL_SECONDS/2)
+@limited('investpy')
+def get_last_price(symbol):
+    # investpy has no intraday bars; today's daily bar carries the last price
+    # while the session is open
+    df=inp.get_stock_recent_data(stock=symbol,country='turkey',as_json=False,order='ascending')
+    if df.empty or df.index[-1].date()!=datetime.now().date():
+        return None
+    return float(df['Close'].iloc[-1])
+
+@remote()
+@cached(ttl=DAY)
+@limited('investpy')
 def get_company_summary(symbol):
 
     summary_text=inp.get_stock_company_profile(stock=symbol,country='turkey')['desc']
     return summary_text
 
-@st.cache()
+@remote()
+@cached(ttl=5*MINUTE)
+@limited('investpy')
 def get_company_info(symbol):
     summary_text=inp.get_stock_information(stock=symbol,country='turkey').set_index('Stock Symbol')
     return summary_text
 
-@st.cache()
+@remote()
 def translate_text(txt):
-    translator = Translator(service_urls=['translate.googleapis.com'])
-    x=translator.translate(txt,src='en', dest='tr')
-    return x.text
+    # translations are stored on disk by translation, a memory cache would
+    # keep serving the untranslated stand-in after the service is back
+    return translation.translate([txt])[0]
 
-@st.cache(show_spinner=False)
-def get_company_logo_url(symbol):
+@remote()
+@cached(ttl=DAY)
+def get_company_logo(symbol):
         try:
-            base_url='https://www.kap.org.tr'
-            page=requests.get(f'{base_url}/tr/bist-sirketler').content
-            soup = BeautifulSoup(page, 'html.parser')
-            element=soup.find(lambda tag:tag.name=="a" and symbol in tag.text)
-            page2=requests.get(base_url+element['href']).content
-            soup2 = BeautifulSoup(page2, 'html.parser')
-            logo_url = base_url+soup2.find("img", {"class": "comp-logo"})['src']
-            return logo_url 
+            kap.start_crawl(get_companies().index)
+            return kap.get_logo(symbol)
         except:
             return 'https://www.designfreelogoonline.com/wp-content/uploads/2014/12/00240-Design-Free-3D-Company-Logo-Templates-03.png'
 
-@st.cache(show_spinner=False)
+@remote()
+@cached(ttl=lambda symbol,interval: INDICATOR_TTL[interval])
 def get_technical_indicators(symbol,interval):
-    return inp.technical_indicators(name=symbol, country='turkey', product_type='stock', interval=interval).set_index('technical_indicator').rename(columns={'value': 'Değer', 'signal': 'Gösterge'})
+    if interval in indicators.LOCAL_INTERVALS:
+        df=indicators.technical_indicators(get_comp_data(symbol),interval)
+    else:
+        df=download_technical_indicators(symbol,interval)
+    return df.set_index('technical_indicator').rename(columns={'value': 'Değer', 'signal': 'Gösterge'})
+
+@limited('investpy')
+def download_technical_indicators(symbol,interval):
+    return inp.technical_indicators(name=symbol, country='turkey', product_type='stock', interval=interval)
+
+@remote()
+@cached(ttl=DAY,value_ttl=lambda data: 10*MINUTE if data.failed else DAY)
+def get_financials(symbol):
+    # the six statements and the dividends are downloaded at once; a batch
+    # with failed parts is kept only briefly, so they are retried soon
+    calls={(summary_type,period):(download_financial_summary,symbol,summary_type,period)
+           for summary_type in financials.SUMMARY_TYPES for period in financials.PERIODS}
+    calls['dividends']=(download_stock_dividends,symbol)
+    results,failed={},[]
+    for part,future in prefetch(calls,FINANCIALS_POOL).items():
+        try:
+            results[part]=future.result()
+        except Exception:
+            failed.append(part)
+            metrics.incr('bist_financials_errors_total',part='_'.join(part) if isinstance(part,tuple) else part)
+            logger.warning('Financials of %s: %s could not be downloaded',symbol,part,exc_info=True)
+    dividends=results.pop('dividends',None)
+    return financials.Financials(
+        financials.statements_table(results),
+        None if dividends is None else financials.dividends_table(dividends),
+        failed
+    )
 
-@st.cache(show_spinner=False)
-def get_financial_summary(symbol,summary_type,period):
+@limited('investpy')
+def download_financial_summary(symbol,summary_type,period):
     return inp.stocks.get_stock_financial_summary(symbol, 'turkey', summary_type=summary_type, period=period)
 
-@st.cache(show_spinner=False)
-def get_stock_dividents(symbol):
-    df=inp.stocks.get_stock_dividends(symbol, 'turkey').set_index('Payment Date').drop(columns='Date')
-    df['Type']=df['Type'].apply(lambda x: ''.join([i[0].upper() for i in x.split('_')]))
-    return df
+@limited('investpy')
+def download_stock_dividends(symbol):
+    return inp.stocks.get_stock_dividends(symbol, 'turkey')
 
-@st.cache()
+@remote()
+@cached(ttl=HOUR)
+@limited('uzmanpara')
 def get_financial_ratios(symbol):
 
     site_url=f'https://uzmanpara.milliyet.com.tr/borsa/anahtar-oranlar/{symbol}/'
 
-    site=requests.get(site_url).content
-    soup=BeautifulSoup(site, 'html.parser')
-    target_div=soup.find('div',{'class' : 'detL'})
-    dt=[[i.parent.find('td',{'class' : x} ).text  for x in ['currency','']] for i in target_div.find_all('td',{'class' : 'currency'})]
-    dct={i:[float(j.replace('.','').replace(',','.'))] for i,j in dt}
-    dct['asset']=symbol
-    return pd.DataFrame(data=dct).set_index('asset')
+    return parsing.parse_financial_ratios(http_client.get(site_url),symbol)
 
-@st.cache()
+@remote()
+@cached(ttl=10*MINUTE)
+@limited('uzmanpara')
 def get_last_10_news(symbol):
     base_url='https://uzmanpara.milliyet.com.tr'
-    page=requests.get(base_url+f'/hisse/hisse-haberleri/{symbol}/').content
-    soup=BeautifulSoup(page, "html.parser")
-    hbr=soup.find('ul',{'class':"newsUl"}).find_all('li')
-
-    news={
-        'link':[],
-        'time':[]
-    }
-    for i in hbr[:10]:
-        news['link'].append(str(i.find('a')).replace('href="/','href="'+base_url+'/'))
-        news['time'].append(i.find('span',{'class':'date'}).text[:10])
-    return pd.DataFrame(news)
+    page=http_client.get(base_url+f'/hisse/hisse-haberleri/{symbol}/')
+    return parsing.parse_news(page,base_url)
+
+
+def candlestick_figure(asset,candlestick_data):
+    fig = go.Figure(
+        data=[
+            go.Candlestick(
+                x=candlestick_data.index,
+                open=candlestick_data['Açılış'],
+                high=candlestick_data['Yüksek'],
+                low=candlestick_data['Düşük'],
+                close=candlestick_data['Kapanış']
+            )
+        ]
+    )
+    fig.update_layout(
+        hovermode="x",
+        yaxis_title='Ortalama Değer (TL)',
+        title=f'{asset} Yürüyen Standart Sapma Grafiği',
+    )
+    return fig
+
+
+def show_screener(companies):
+    panel.start_warmer(list(companies.index),get_comp_data)
+    st.title('BİST Hisse Tarama')
+
+    prices=panel.current()
+    if prices is None:
+        st.info('Fiyat verileri hazırlanıyor, birkaç dakika sonra tekrar deneyin.')
+        return
+    results=screener.screen(prices)
+
+    st.sidebar.subheader('Tarama Kriterleri')
+    min_return=st.sidebar.slider('En Düşük 1 Aylık Getiri (%)', min_value=-100, max_value=100, value=-100, step=5)
+    cross=st.sidebar.selectbox('Ortalama Kesişimi',['Tümü','Yukarı Kesişim','Aşağı Kesişim'])
+    band=st.sidebar.selectbox('Bant Konumu',['Tümü','Üst Bandın Üstünde','Alt Bandın Altında'])
+    min_volume_spike=st.sidebar.slider('En Düşük Hacim Artışı (x)', min_value=0.0, max_value=10.0, value=0.0, step=0.5)
+    sort_column=st.sidebar.selectbox('Sıralama',[c for c in results.columns if c!='Ortalama Kesişimi'],index=2)
+    count=st.sidebar.slider('Gösterilecek Hisse Sayısı', min_value=10, max_value=200, value=50, step=10)
+
+    selected=results
+    if min_return>-100:
+        selected=selected[selected['1 Ay (%)']>=min_return]
+    if cross!='Tümü':
+        selected=selected[selected['Ortalama Kesişimi']==cross]
+    if band=='Üst Bandın Üstünde':
+        selected=selected[selected['Bant Konumu']>1]
+    elif band=='Alt Bandın Altında':
+        selected=selected[selected['Bant Konumu']<0]
+    if min_volume_spike>0:
+        selected=selected[selected['Hacim Artışı (x)']>=min_volume_spike]
+    selected=selected.sort_values(sort_column,ascending=False).head(count)
+
+    st.markdown(f'{prices.dates[-1]:%d.%m.%Y} kapanışına göre {len(results)} hisseden {len(selected)} tanesi listeleniyor.')
+    st.dataframe(companies[['Kısa İsim']].join(selected,how='inner').loc[selected.index])
+
+
+def show_comparison(companies):
+    st.title('BİST Hisse Karşılaştırma')
+
+    symbols=st.sidebar.multiselect(
+        'Karşılaştırılacak Şirketler',
+        list(companies.index),
+        default=[s for s in ['GARAN','AKBNK','THYAO','ASELS'] if s in companies.index],
+        format_func=lambda symbol: symbol + ' - ' + companies.loc[symbol]['Kısa İsim']
+    )
+    section=st.sidebar.slider('Geriye Dönük Veri Sayısı', min_value=30, max_value=2000, value=250, step=10)
+    period=st.sidebar.slider('Korelasyon ve Beta Periyodu', min_value=10, max_value=250, value=60, step=5)
+    chart_points=None if st.sidebar.checkbox('Grafikte Tüm Verileri Göster', False) else decimate.CHART_POINTS
+
+    if not symbols:
+        st.info('Karşılaştırmak için en az bir şirket seçin.')
+        return
+
+    # all histories are fetched at once, each through the cache and limits
+    fetches={symbol:(get_comp_data,symbol) for symbol in symbols}
+    fetches[BENCHMARK_INDEX]=(get_index_data,BENCHMARK_INDEX)
+    frames={}
+    for name,future in prefetch(fetches,COMPARISON_POOL).items():
+        try:
+            frames[name]=future.result()
+        except Exception:
+            st.warning(f'{name} verileri alınamadı.')
+    if BENCHMARK_INDEX not in frames or len(frames)<2:
+        return
+
+    with metrics.span('compute:align'):
+        prices=compare.align(frames,'Close').iloc[-(section+period):]
+    returns=compare.log_returns(prices)
+    stock_returns=returns.drop(columns=BENCHMARK_INDEX)
+    correlation,beta=compare.rolling_beta(stock_returns,returns[BENCHMARK_INDEX],period)
+    performance=compare.normalized(prices.iloc[-section:])
+
+    st.subheader('Normalize Edilmiş Performans (Başlangıç = 100)')
+    with metrics.span('render:chart'):
+        st.line_chart(decimate.even_rows(performance,chart_points))
+
+    chart_col1,chart_col2=st.beta_columns(2)
+    chart_col1.subheader(f'{BENCHMARK_INDEX} ile {period} Günlük Korelasyon')
+    chart_col2.subheader(f'{BENCHMARK_INDEX} ile {period} Günlük Beta')
+    with metrics.span('render:chart'):
+        chart_col1.line_chart(decimate.even_rows(correlation.iloc[-section:],chart_points))
+        chart_col2.line_chart(decimate.even_rows(beta.iloc[-section:],chart_points))
+
+    st.subheader(f'Son {period} Günün Korelasyon Matrisi')
+    matrix=compare.correlation_matrix(returns,period)
+    heatmap=go.Figure(go.Heatmap(
+        z=matrix.values,
+        x=matrix.columns,
+        y=matrix.index,
+        zmin=-1,
+        zmax=1,
+        colorscale='RdBu'
+    ))
+    with metrics.span('render:chart'):
+        st.plotly_chart(heatmap,use_container_width=True)
+
+    st.subheader('Özet')
+    st.table(pd.DataFrame({
+        'Getiri (%)':performance.iloc[-1]-100,
+        'Korelasyon':correlation.iloc[-1],
+        'Beta':beta.iloc[-1]
+    }).sort_values('Getiri (%)',ascending=False))
 
 
 def main():
+    metrics.start_run()
     companies = get_companies()
-    title = st.title('BİST Veri İnceleme')
+    translation.start_pretranslate(list(companies.index),get_company_summary)
     st.sidebar.title("Seçenekler")
 
+    page=st.sidebar.radio('Sayfa',['Şirket İnceleme','Hisse Tarama','Karşılaştırma'])
+    if page=='Hisse Tarama':
+        show_screener(companies)
+        return
+    if page=='Karşılaştırma':
+        show_comparison(companies)
+        return
+
+    title = st.title('BİST Veri İnceleme')
+
     def label(symbol):
         a = companies.loc[symbol]
         return symbol + ' - ' + a['Kısa İsim']
@@ -130,27 +359,22 @@ def main():
     st.sidebar.subheader('Şirket Seçimi')
 
     
+    # the company table is kept sorted by symbol
     try:
-        starting_company_index=list(companies.index.sort_values()).index('GARAN')
-    except:
+        starting_company_index=companies.index.get_loc('GARAN')
+    except KeyError:
         starting_company_index=3
     asset = st.sidebar.selectbox('Aşağıdaki listeden istediğiniz şirketi seçebilirsiniz.',
-                                 companies.index.sort_values(), index=starting_company_index,
+                                 companies.index, index=starting_company_index,
                                  format_func=label)
     
     
 
     header_col1, header_col2,header_col3 = st.beta_columns((1, 2, 2))
 
-    header_col1.image(
-            get_company_logo_url(asset),
-            width=100, # Manually Adjust the width of the image as per requirement
-        )
+    logo=header_col1.empty()
 
     subheader=header_col1.markdown(companies.loc[asset]['Şirket'])                         
-    
-    company_info=get_company_info(asset)
-    arr_len=len(company_info.loc[asset])
 
     summary_table_type = header_col1.selectbox(
             'İncelemek İstediğiniz Bilgileri Aşağıdaki Lisdeten Seçiniz',
@@ -161,9 +385,32 @@ def main():
             index=1
         )
 
+    # every widget deciding what to fetch is placed first, then all fetches
+    # are started together and each panel is drawn into its placeholder as
+    # soon as its own result arrives
+    fetches={
+        'logo':(get_company_logo,asset),
+        'comp_data':(get_comp_data,asset)
+    }
+    panels={
+        'logo':lambda result: logo.image(
+            result.result(),
+            width=100, # Manually Adjust the width of the image as per requirement
+        )
+    }
+
     if summary_table_type=='Market Bilgileri':
-        header_col2.table(company_info.loc[asset][arr_len//2:])
-        header_col3.table(company_info.loc[asset][:arr_len//2])  
+        info_slot_2=header_col2.empty()
+        info_slot_3=header_col3.empty()
+
+        def show_company_info(result):
+            company_info=result.result()
+            arr_len=len(company_info.loc[asset])
+            info_slot_2.table(company_info.loc[asset][arr_len//2:])
+            info_slot_3.table(company_info.loc[asset][:arr_len//2])
+
+        fetches['company_info']=(get_company_info,asset)
+        panels['company_info']=show_company_info
 
     elif summary_table_type=='Teknik Göstergeler':
         period_dict={
@@ -177,20 +424,18 @@ def main():
                 'Aylık':'monthly'
             }
 
-        
-        technical_indicator_table_1=header_col2.table(
-            get_technical_indicators(
-                asset,
-                period_dict[header_col2.selectbox('1. Teknik Gösterge Hesaplama Periyodu',list(period_dict.keys()),
-                index=3)])
-        )
+        interval_1=period_dict[header_col2.selectbox('1. Teknik Gösterge Hesaplama Periyodu',list(period_dict.keys()),
+                index=3)]
+        technical_indicator_slot_1=header_col2.empty()
 
-        technical_indicator_table_1=header_col3.table(
-            get_technical_indicators(
-                asset,
-                period_dict[header_col3.selectbox('2. Teknik Gösterge Hesaplama Periyodu',list(period_dict.keys()),
-                index=7)])
-        )
+        interval_2=period_dict[header_col3.selectbox('2. Teknik Gösterge Hesaplama Periyodu',list(period_dict.keys()),
+                index=7)]
+        technical_indicator_slot_2=header_col3.empty()
+
+        fetches['technical_indicators_1']=(get_technical_indicators,asset,interval_1)
+        fetches['technical_indicators_2']=(get_technical_indicators,asset,interval_2)
+        panels['technical_indicators_1']=lambda result: technical_indicator_slot_1.table(result.result())
+        panels['technical_indicators_2']=lambda result: technical_indicator_slot_2.table(result.result())
 
     elif summary_table_type=='Finansal Özet':
         summary_period_dict={
@@ -204,35 +449,50 @@ def main():
             'Kar Dağıtımı':'divident'
         }
 
+        # every statement and period comes in one cached batch, so changing
+        # the selections below is only a lookup in it
         summary_type_1=summary_type_dict[header_col2.selectbox('1. Finansal Özet Çeşidi',list(summary_type_dict.keys()),index=0)]
-
-        if summary_type_1=='divident':
-            header_col2.table(get_stock_dividents(asset))
-        else:
-            header_col2.table(get_financial_summary(
-                asset,
-                summary_type_1,
-                summary_period_dict[header_col2.selectbox('1. Finansal Özet Periyodu',list(summary_period_dict.keys()),index=0)]
-            ))
+        if summary_type_1!='divident':
+            summary_period_1=summary_period_dict[header_col2.selectbox('1. Finansal Özet Periyodu',list(summary_period_dict.keys()),index=0)]
+        financial_summary_slot_1=header_col2.empty()
 
         summary_type_2=summary_type_dict[header_col3.selectbox('2. Finansal Özet Çeşidi',list(summary_type_dict.keys()),index=1)]
-
-        if summary_type_2=='divident':
-            header_col3.table(get_stock_dividents(asset))
-        else:
-            header_col3.table(get_financial_summary(
-                asset,
-                summary_type_2,
-                summary_period_dict[header_col3.selectbox('2. Finansal Özet Periyodu',list(summary_period_dict.keys()),index=1)]
-            ))
+        if summary_type_2!='divident':
+            summary_period_2=summary_period_dict[header_col3.selectbox('2. Finansal Özet Periyodu',list(summary_period_dict.keys()),index=1)]
+        financial_summary_slot_2=header_col3.empty()
+
+        def show_financial_summary(slot,data,summary_type,period=None):
+            if summary_type=='divident':
+                table=data.dividends
+            else:
+                table=financials.statement(data.statements,summary_type,period)
+            if table is None or table.empty:
+                slot.info('Veri Bulunamadı')
+            else:
+                slot.table(table)
+
+        def show_financials(result):
+            data=result.result()
+            show_financial_summary(financial_summary_slot_1,data,summary_type_1,
+                                   None if summary_type_1=='divident' else summary_period_1)
+            show_financial_summary(financial_summary_slot_2,data,summary_type_2,
+                                   None if summary_type_2=='divident' else summary_period_2)
+
+        fetches['financials']=(get_financials,asset)
+        panels['financials']=show_financials
 
     elif summary_table_type=='Mali Değerler':
+        fin_ratios_slot_2=header_col2.empty()
+        fin_ratios_slot_3=header_col3.empty()
 
-        fin_ratios=get_financial_ratios(asset)
-        fin_ratios_arr_len=len(fin_ratios.loc[asset])
+        def show_financial_ratios(result):
+            fin_ratios=result.result()
+            fin_ratios_arr_len=len(fin_ratios.loc[asset])
+            fin_ratios_slot_2.table(fin_ratios.loc[asset][fin_ratios_arr_len//2:])
+            fin_ratios_slot_3.table(fin_ratios.loc[asset][:fin_ratios_arr_len//2])
 
-        header_col2.table(fin_ratios.loc[asset][fin_ratios_arr_len//2:])
-        header_col3.table(fin_ratios.loc[asset][:fin_ratios_arr_len//2])
+        fetches['financial_ratios']=(get_financial_ratios,asset)
+        panels['financial_ratios']=show_financial_ratios
 
 
 
@@ -240,41 +500,51 @@ def main():
 
     if header_col1.checkbox('Şirket Amaç ve Konusu', False):      
 
-        try:
-            en_summary_text=get_company_summary(asset)
+        translate=st.checkbox('Bilgileri Türkçeye Çevir',False)
+        summary_text=st.empty()
 
-            show_summary_text=en_summary_text
-        except:
-            show_summary_text='Cannot Find Summary'
+        def show_company_summary(result):
+            try:
+                en_summary_text=result.result()
 
-        if st.checkbox('Bilgileri Türkçeye Çevir',False):
-            tr_summary_text=translate_text(en_summary_text)
-            show_summary_text=tr_summary_text
-        
-        summary_text=st.markdown(show_summary_text)
+                show_summary_text=en_summary_text
+                if translate:
+                    show_summary_text=translate_text(en_summary_text)
+            except:
+                show_summary_text='Cannot Find Summary'
+
+            summary_text.markdown(show_summary_text)
+
+        fetches['company_summary']=(get_company_summary,asset)
+        panels['company_summary']=show_company_summary
         
     
     if header_col1.checkbox('Güncel Şirket Haberlerini Göster', False):  
         
         pd.set_option('display.max_colwidth', None)
+        new_news_table=st.empty()
 
-        try:
-            new_news=get_last_10_news(asset).to_html(escape=False, index=False)
+        def show_news(result):
+            try:
+                new_news=result.result().to_html(escape=False, index=False)
+            except:
+                new_news='Haber Bulunamadı'
 
-            
-        except:
-            new_news='Haber Bulunamadı'
-        
-        
-        new_news_table=st.write(new_news,unsafe_allow_html=True)
+            new_news_table.write(new_news,unsafe_allow_html=True)
+
+        fetches['news']=(get_last_10_news,asset)
+        panels['news']=show_news
+
+    futures=prefetch(fetches)
+    for future in as_completed([futures[name] for name in panels]):
+        name=next(name for name in panels if futures[name] is future)
+        with metrics.span(f'render:{name}'):
+            panels[name](future)
 
        
 
         
-    data0 = get_comp_data(asset)
-    data = data0.copy().dropna()
-    data.index.name = None
-    data.columns=['Açılış', 'Yüksek', 'Düşük','Kapanış', 'Hacim','Para Birimi']
+    data = prepared.prepare_comp_data(asset,futures['comp_data'].result())
     
 
     section = st.sidebar.slider('Geriye Dönük Veri Sayısı', 
@@ -296,24 +566,29 @@ def main():
         graph_types
     )
 
+    # charts get about one point per pixel, shorter windows are sent as they are
+    full_resolution=st.sidebar.checkbox('Grafikte Tüm Verileri Göster', False)
+    chart_points=None if full_resolution else decimate.CHART_POINTS
+
     if selected_graph_type == 'Alan Grafiği':
         st.subheader('Grafik Veri Seçimi')
         option = st.selectbox(
             'Grafikte Kullanılacak Veri',
-            data.columns[:-1],
+            data.columns,
             index=3
         )
 
         data2 = data[-section:][option].to_frame(option)
 
         st.subheader(f'{asset} {option} {selected_graph_type}')
-        st.area_chart(data2)
+        with metrics.span('render:chart'):
+            st.area_chart(decimate.lttb_frame(data2,option,chart_points))
 
     elif selected_graph_type == 'Çizgi Grafiği':
         st.subheader('Grafik Veri Seçimi')
         option = st.selectbox(
             'Grafikte Kullanılacak Veri',
-            data.columns[:-1],
+            data.columns,
             index=3
         )
 
@@ -341,17 +616,17 @@ def main():
                                 value=5,  step=1)
                 pred_days=lin_reg_col2.slider('Tahmin Edilecek Gün Sayısı', min_value=1, max_value=90,
                                 value=30,  step=1)
-                xaxis = range(len(data2.index))
-                coefficients = np.polyfit(xaxis,data2[option],lin_reg_degree)
-                f = np.poly1d(coefficients)
-
-                y_pred={'lin_reg':[f(x) for x in range(len(xaxis)+pred_days)]}
-                new_x=data2.index.to_list()+[data2.index.to_list()[-1]+timedelta(days=i) for i in range(1,pred_days+1)]
-                new_df = pd.DataFrame(y_pred, index = new_x) 
+                new_df = forecast.polynomial_forecast(
+                    (asset,option,section),
+                    data2[option],
+                    lin_reg_degree,
+                    pred_days
+                ).to_frame('lin_reg')
 
                 data2=pd.concat([data2, new_df], axis=1)
 
-                main_chart=st.line_chart(data2)
+                with metrics.span('render:chart'):
+                    main_chart=st.line_chart(decimate.lttb_frame(data2,option,chart_points))
 
 
             elif pred_model=='Yürüyen Ortalama':
@@ -362,18 +637,17 @@ def main():
                 if sma:
                     period= sma_1_col2.slider('1. Yürüyen Ortalama Periyodu', min_value=5, max_value=500,
                                         value=20,  step=1)
-                    data[f'1. Yürüyen Ortalama {period}'] = data[option].rolling(period ).mean()
-                    data2[f'1. Yürüyen Ortalama {period}'] = data[f'1. Yürüyen Ortalama {period}'].reindex(data2.index)
+                    data2[f'1. Yürüyen Ortalama {period}'] = stats.rolling_mean((asset,option),data[option],period,section)
 
                 sma_2_col1, sma_2_col2 = st.beta_columns(2)
                 sma2 = sma_2_col1.checkbox('2. Yürüyen Ortalama')
                 if sma2:
                     period2= sma_2_col2.slider('2. Yürüyen Ortalama Periyodu', min_value=5, max_value=500,
                                         value=100,  step=1)
-                    data[f'2. Yürüyen Ortalama {period2}'] = data[option].rolling(period2).mean()
-                    data2[f'2. Yürüyen Ortalama {period2}'] = data[f'2. Yürüyen Ortalama {period2}'].reindex(data2.index)
+                    data2[f'2. Yürüyen Ortalama {period2}'] = stats.rolling_mean((asset,option),data[option],period2,section)
 
-                main_chart=st.line_chart(data2)
+                with metrics.span('render:chart'):
+                    main_chart=st.line_chart(decimate.lttb_frame(data2,option,chart_points))
 
             elif pred_model=='Yürüyen Standart Sapma':
 
@@ -381,10 +655,12 @@ def main():
                
                 stdev1 = stdev_1_col1.checkbox('1. Yürüyen Standart Sapma',True)
 
+                chart_rows=decimate.lttb_rows(data2[option],chart_points)
+
                 go_stdev_main=go.Scatter(
                     name= asset,
-                    x=data2[option].index,
-                    y=data2[option],
+                    x=data2.index[chart_rows],
+                    y=data2[option].iloc[chart_rows],
                     mode='lines',
                     line=dict(color='rgb(31, 119, 180)')
                 )
@@ -398,16 +674,15 @@ def main():
                         step=1
                     )
 
-                    data[f'1. Yürüyen Standart Sapma Üst - {period}'] = data[option] + data[option].rolling(period).std()*2 
-                    data[f'1. Yürüyen Standart Sapma Alt - {period}'] = data[option] - data[option].rolling(period).std()*2
-                    data2[f'1. Yürüyen Standart Sapma Üst - {period}'] = data[f'1. Yürüyen Standart Sapma Üst - {period}'].reindex(data2.index)
-                    data2[f'1. Yürüyen Standart Sapma Alt - {period}'] = data[f'1. Yürüyen Standart Sapma Alt - {period}'].reindex(data2.index)
+                    upper,lower=stats.bollinger_bands((asset,option),data[option],period,section)
+                    data2[f'1. Yürüyen Standart Sapma Üst - {period}'] = upper
+                    data2[f'1. Yürüyen Standart Sapma Alt - {period}'] = lower
 
 
                     go_stdev_1_upper=go.Scatter(
                         name='1. Üst Sınır',
-                        x=data2[option].index,
-                        y=data2[f'1. Yürüyen Standart Sapma Üst - {period}'],
+                        x=data2.index[chart_rows],
+                        y=data2[f'1. Yürüyen Standart Sapma Üst - {period}'].iloc[chart_rows],
                         mode='lines',
                         marker=dict(color="#633"),
                         line=dict(width=0),
@@ -416,8 +691,8 @@ def main():
 
                     go_stdev_1_lower=go.Scatter(
                         name='1. Alt Sınır',
-                        x=data2[option].index,
-                        y=data2[f'1. Yürüyen Standart Sapma Alt - {period}'],
+                        x=data2.index[chart_rows],
+                        y=data2[f'1. Yürüyen Standart Sapma Alt - {period}'].iloc[chart_rows],
                         marker=dict(color="#633"),
                         line=dict(width=0),
                         mode='lines',
@@ -439,16 +714,15 @@ def main():
                         step=1
                     )
 
-                    data[f'1. Yürüyen Standart Sapma Üst - {period2}'] = data[option] + data[option].rolling(period2).std()*2 
-                    data[f'1. Yürüyen Standart Sapma Alt - {period2}'] = data[option] - data[option].rolling(period2).std()*2
-                    data2[f'1. Yürüyen Standart Sapma Üst - {period2}'] = data[f'1. Yürüyen Standart Sapma Üst - {period2}'].reindex(data2.index)
-                    data2[f'1. Yürüyen Standart Sapma Alt - {period2}'] = data[f'1. Yürüyen Standart Sapma Alt - {period2}'].reindex(data2.index)
+                    upper,lower=stats.bollinger_bands((asset,option),data[option],period2,section)
+                    data2[f'1. Yürüyen Standart Sapma Üst - {period2}'] = upper
+                    data2[f'1. Yürüyen Standart Sapma Alt - {period2}'] = lower
 
 
                     go_stdev_2_upper=go.Scatter(
                         name='2. Üst Sınır',
-                        x=data2[option].index,
-                        y=data2[f'1. Yürüyen Standart Sapma Üst - {period2}'],
+                        x=data2.index[chart_rows],
+                        y=data2[f'1. Yürüyen Standart Sapma Üst - {period2}'].iloc[chart_rows],
                         mode='lines',
                         marker=dict(color="#a88"),
                         line=dict(width=0),
@@ -457,8 +731,8 @@ def main():
 
                     go_stdev_2_lower=go.Scatter(
                         name='2. Alt Sınır',
-                        x=data2[option].index,
-                        y=data2[f'1. Yürüyen Standart Sapma Alt - {period2}'],
+                        x=data2.index[chart_rows],
+                        y=data2[f'1. Yürüyen Standart Sapma Alt - {period2}'].iloc[chart_rows],
                         marker=dict(color="#a88"),
                         line=dict(width=0),
                         mode='lines',
@@ -486,35 +760,23 @@ def main():
                     hovermode="x"
                 )
                 conf={'scrollZoom': True}
-                st.plotly_chart(stdev_fig, use_container_width=True,scroll_zoom= True,config=conf)
+                with metrics.span('render:chart'):
+                    st.plotly_chart(stdev_fig, use_container_width=True,scroll_zoom= True,config=conf)
         else:
-            main_chart=st.line_chart(data2)
+            with metrics.span('render:chart'):
+                main_chart=st.line_chart(decimate.lttb_frame(data2,option,chart_points))
 
     elif selected_graph_type == 'Mum Grafiği':
         data2 = data[-section:]
 
         st.subheader(f'{asset} {selected_graph_type}')
 
-        candlestick_data=data[-section:]
+        candlestick_data=decimate.ohlc_buckets(data[-section:],chart_points,'Açılış','Yüksek','Düşük','Kapanış')
 
-        fig = go.Figure(
-            data=[
-                go.Candlestick(
-                    x=candlestick_data.index,
-                    open=candlestick_data['Açılış'],
-                    high=candlestick_data['Yüksek'],
-                    low=candlestick_data['Düşük'],
-                    close=candlestick_data['Kapanış']
-                )
-            ]
-        )
-        fig.update_layout(
-            hovermode="x",
-            yaxis_title='Ortalama Değer (TL)',
-            title=f'{asset} Yürüyen Standart Sapma Grafiği',
-        )
+        fig = candlestick_figure(asset,candlestick_data)
         conf={'scrollZoom': True}
-        st.plotly_chart(fig, use_container_width=True,scroll_zoom= True,config=conf)
+        with metrics.span('render:chart'):
+            st.plotly_chart(fig, use_container_width=True,scroll_zoom= True,config=conf)
 
 
 
@@ -528,6 +790,17 @@ def main():
 
 
 
+    live_mode=st.sidebar.checkbox('Canlı Mod',False)
+
+    if st.sidebar.checkbox('Bağlantı Süreleri'):
+        st.sidebar.table(http_client.latency_report())
+
+    if metrics.ENABLED and st.sidebar.checkbox('Performans Bilgileri'):
+        st.subheader('Performans Bilgileri')
+        spans=pd.DataFrame(metrics.current_run(),columns=['Adım','Süre (ms)','Hata'])
+        st.table(spans.groupby('Adım').agg({'Süre (ms)':'sum','Hata':'any'}).sort_values('Süre (ms)',ascending=False))
+        st.table(pd.Series(metrics.counters(),name='Değer').to_frame())
+
     st.sidebar.subheader("Site Hakkında")
     st.sidebar.info(    'Bu web uygulaması Oğuzhan Atakan tarafında hazırlanmıştır.\n'
                         'İncelemek için: https://github.com/oozzyy-bit/streamlit-investpy')
@@ -538,5 +811,49 @@ def main():
     info_col_1,info_col_2=st.sidebar.beta_columns((1,6))
     info_col_1.markdown(html, unsafe_allow_html=True)
     info_col_2.markdown('oguzhan.atakan.tr@gmail.com')
+
+    if live_mode:
+        show_live_chart(asset)
+
+
+def show_live_chart(asset):
+    # runs until the session changes a widget: only the bars closed since the
+    # last poll are sent to the chart, the rolling columns come with them
+    live_period_dict={
+        '5 Dakika':'5mins',
+        '15 Dakika':'15mins',
+        '30 Dakika':'30mins',
+        '1 Saat':'1hour'
+    }
+    st.subheader(f'{asset} Canlı Fiyat')
+    live_interval=live_period_dict[st.selectbox('Canlı Grafik Periyodu',list(live_period_dict.keys()))]
+
+    feed=live.subscribe(asset,get_last_price)
+    version=feed.version
+    bars=feed.frame(live_interval)
+    live_chart=st.line_chart(bars)
+    current_bar=st.empty()
+    heartbeat=st.empty()
+    last_bar=bars.index[-1] if len(bars) else None
+    shown_version=None
+
+    while True:
+        if version!=shown_version:
+            current=feed.current(live_interval)
+            if current is None:
+                current_bar.info('Piyasa kapalı veya henüz fiyat alınamadı.')
+            else:
+                current_bar.table(current.to_frame(f'{current.name:%H:%M} - Oluşan Bar'))
+
+            new_bars=feed.frame(live_interval,after=last_bar)
+            if len(new_bars):
+                live_chart.add_rows(new_bars)
+                last_bar=new_bars.index[-1]
+            shown_version=version
+
+        version=feed.wait(version)
+        # Streamlit only notices a widget change when the script sends an
+        # element, so an empty one is sent after every short wait
+        heartbeat.empty()
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,190 @@
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+logger = logging.getLogger(__name__)
+
+# BIST_METRICS=1 turns the instrumentation on; when off every hook below is a
+# constant-time no-op
+ENABLED = os.environ.get('BIST_METRICS', '') not in ('', '0')
+# Prometheus text endpoint at http://0.0.0.0:<port>/metrics
+PORT = int(os.environ.get('BIST_METRICS_PORT', '0'))
+# file rewritten with the same text every FILE_INTERVAL seconds
+FILE = os.environ.get('BIST_METRICS_FILE')
+FILE_INTERVAL = 15
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float('inf'))
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_local = threading.local()
+_NULL_SPAN = nullcontext()
+_exporters_started = False
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def incr(name, amount=1, **labels):
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe(name, seconds, **labels):
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [[0] * len(BUCKETS), 0, 0.0]
+        histogram[0][bisect_left(BUCKETS, seconds)] += 1
+        histogram[1] += 1
+        histogram[2] += seconds
+
+
+class _Span:
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        observe('bist_span_seconds', seconds, span=self.name)
+        run = getattr(_local, 'run', None)
+        if run is not None:
+            run.append((self.name, 1000 * seconds, exc_type is not None))
+        return False
+
+
+def span(name):
+    return _Span(name) if ENABLED else _NULL_SPAN
+
+
+def start_run():
+    # spans recorded by this script run, shown in the debug sidebar panel
+    if ENABLED:
+        _local.run = []
+        _start_exporters()
+
+
+def current_run():
+    return list(getattr(_local, 'run', None) or [])
+
+
+def bind(func):
+    # lets a thread pool task record its spans into the submitting run
+    if not ENABLED:
+        return func
+    run = getattr(_local, 'run', None)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        _local.run = run
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _local.run = None
+    return wrapper
+
+
+def counters():
+    with _lock:
+        return {name + _labels(labels): value for (name, labels), value in sorted(_counters.items())}
+
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in pairs) + '}'
+
+
+def render():
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: ([*buckets], count, total) for key, (buckets, count, total) in _histograms.items()}
+
+    lines = []
+    for name in sorted({name for name, _ in counters}):
+        lines.append(f'# TYPE {name} counter')
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f'{name}{_labels(labels)} {value}')
+
+    for name in sorted({name for name, _ in histograms}):
+        lines.append(f'# TYPE {name} histogram')
+        for (metric, labels), (buckets, count, total) in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, n in zip(BUCKETS, buckets):
+                cumulative += n
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{name}_bucket{_labels(labels, [("le", le)])} {cumulative}')
+            lines.append(f'{name}_count{_labels(labels)} {count}')
+            lines.append(f'{name}_sum{_labels(labels)} {total}')
+    return '\n'.join(lines) + '\n'
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _write_file():
+    while True:
+        time.sleep(FILE_INTERVAL)
+        try:
+            tmp_path = f'{FILE}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(render())
+            os.replace(tmp_path, FILE)
+        except OSError:
+            logger.warning('Cannot write metrics to %s', FILE, exc_info=True)
+
+
+def _start_exporters():
+    global _exporters_started
+    with _lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+
+    if PORT:
+        try:
+            server = ThreadingHTTPServer(('0.0.0.0', PORT), _Handler)
+        except OSError:
+            # another worker of the same host already serves the port
+            logger.warning('Metrics port %s is taken', PORT)
+        else:
+            threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    if FILE:
+        threading.Thread(target=_write_file, name='metrics-file', daemon=True).start()
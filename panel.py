@@ -0,0 +1,102 @@
+import logging
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import metrics
+import store
+
+
+logger = logging.getLogger(__name__)
+
+# trading days kept per symbol, enough for three month returns and the
+# longest moving average of the screener
+PANEL_DAYS = 260
+# the warmer refreshes the whole universe this often; its fetches are paced by
+# the investpy limits in upstream.py, more workers only queue there
+WARM_INTERVAL = 15 * 60
+WARM_WORKERS = 4
+
+# closes and volumes are (symbols x dates) arrays, forward filled, NaN before
+# a symbol's first bar
+Panel = namedtuple('Panel', ['symbols', 'dates', 'close', 'volume', 'built'])
+
+_panel = None
+_lock = threading.Lock()
+_warmer_started = False
+
+
+def build_panel(symbols):
+    closes, volumes = {}, {}
+    for symbol in symbols:
+        df = store.load_ohlcv(symbol)
+        if df is None or df.empty:
+            continue
+        df = df.iloc[-PANEL_DAYS:]
+        closes[symbol] = df['Close']
+        volumes[symbol] = df['Volume']
+    if not closes:
+        return None
+
+    close = pd.DataFrame(closes).sort_index().ffill().iloc[-PANEL_DAYS:]
+    # no bar after the listing is a day without trades, before it there is
+    # no data
+    volume = pd.DataFrame(volumes).reindex(close.index).fillna(0).where(close.notna())
+    return Panel(
+        symbols=close.columns,
+        dates=close.index,
+        close=close.to_numpy(dtype=np.float64).T.copy(),
+        volume=volume.to_numpy(dtype=np.float64).T.copy(),
+        built=time.time(),
+    )
+
+
+def current():
+    return _panel
+
+
+def _rebuild(symbols):
+    global _panel
+    with metrics.span('compute:panel'):
+        panel = build_panel(symbols)
+    if panel is not None:
+        with _lock:
+            _panel = panel
+
+
+def _warm(symbols, fetch):
+    pool = ThreadPoolExecutor(max_workers=WARM_WORKERS, thread_name_prefix='panel-warmer')
+    while True:
+        start = time.time()
+        failed = 0
+        for future in [pool.submit(fetch, symbol) for symbol in symbols]:
+            try:
+                future.result()
+            except Exception:
+                failed += 1
+        if failed:
+            metrics.incr('bist_panel_warm_errors_total', failed)
+            logger.warning('Panel warmer could not fetch %d of %d symbols', failed, len(symbols))
+        _rebuild(symbols)
+        time.sleep(max(0, WARM_INTERVAL - (time.time() - start)))
+
+
+def start_warmer(symbols, fetch):
+    # fetch(symbol) brings the symbol's stored history up to date. The panel
+    # is first built from whatever the store already has, then rebuilt after
+    # every pass over the universe.
+    global _warmer_started
+    with _lock:
+        if _warmer_started:
+            return
+        _warmer_started = True
+
+    def run():
+        _rebuild(symbols)
+        _warm(symbols, fetch)
+
+    threading.Thread(target=run, name='panel-warmer', daemon=True).start()
@@ -0,0 +1,88 @@
+import io
+
+import pandas as pd
+from lxml import etree
+
+
+def has_class(name):
+    return f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
+
+
+# precompiled once, evaluated by libxml2
+RATIO_LABEL_CELLS = etree.XPath(f'.//td[{has_class("currency")}]')
+RATIO_LABEL = etree.XPath(f'(.//td[{has_class("currency")}])[1]')
+RATIO_VALUE = etree.XPath('(.//td[not(@class) or normalize-space(@class)=""])[1]')
+NEWS_ITEMS = etree.XPath('.//li')
+NEWS_LINK = etree.XPath('(.//a)[1]')
+NEWS_DATE = etree.XPath(f'(.//span[{has_class("date")}])[1]')
+LINKS = etree.XPath('//a[@href]')
+LOGO_SRC = etree.XPath(f'(//img[{has_class("comp-logo")}])[1]/@src')
+
+
+def text(element):
+    return ''.join(element.itertext())
+
+
+def decode(content):
+    try:
+        return content.decode('utf-8')
+    except UnicodeDecodeError:
+        return content.decode('windows-1254')
+
+
+def document(content):
+    return etree.HTML(decode(content))
+
+
+def subtree(content, tag, class_name):
+    # Parses the page only up to the end of the first <tag class="class_name">
+    # and returns that element, the rest of the page is never read
+    events = etree.iterparse(
+        io.BytesIO(decode(content).encode('utf-8')),
+        events=('end',),
+        tag=tag,
+        html=True,
+        encoding='utf-8',
+        recover=True,
+        no_network=True
+    )
+    for _, element in events:
+        if class_name in element.get('class', '').split():
+            return element
+    raise ValueError(f'<{tag} class="{class_name}"> not found')
+
+
+def turkish_numbers(texts):
+    # '1.234,56' -> 1234.56 for the whole column at once
+    return (
+        pd.Series(texts, dtype=object)
+        .str.strip()
+        .str.replace('.', '', regex=False)
+        .str.replace(',', '.', regex=False)
+        .astype(float)
+        .tolist()
+    )
+
+
+def parse_financial_ratios(content, symbol):
+    target_div = subtree(content, 'div', 'detL')
+    rows = [cell.getparent() for cell in RATIO_LABEL_CELLS(target_div)]
+    labels = [text(RATIO_LABEL(row)[0]) for row in rows]
+    values = turkish_numbers([text(RATIO_VALUE(row)[0]) for row in rows])
+
+    dct = {label: [value] for label, value in zip(labels, values)}
+    dct['asset'] = symbol
+    return pd.DataFrame(data=dct).set_index('asset')
+
+
+def parse_news(content, base_url, count=10):
+    news_list = subtree(content, 'ul', 'newsUl')
+    news = {
+        'link': [],
+        'time': []
+    }
+    for item in NEWS_ITEMS(news_list)[:count]:
+        link = etree.tostring(NEWS_LINK(item)[0], encoding='unicode', method='html', with_tail=False)
+        news['link'].append(link.replace('href="/', 'href="' + base_url + '/'))
+        news['time'].append(text(NEWS_DATE(item)[0])[:10])
+    return pd.DataFrame(news)
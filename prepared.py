@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+import metrics
+import store
+from cache import Cache
+
+
+# prepared frames per symbol, shared by all sessions of the process
+_frames = Cache(64 * 1024 * 1024, 'prepared')
+FRAME_TTL = 60 * 60
+
+PRICE_COLUMNS = {'Open': 'Açılış', 'High': 'Yüksek', 'Low': 'Düşük', 'Close': 'Kapanış'}
+VOLUME_COLUMN = {'Volume': 'Hacim'}
+
+
+def prepare_comp_data(symbol, bars):
+    # Prices are float32 and volumes int64, each one read-only block; the
+    # currency is kept in attrs['currency'] instead of a column. Views take
+    # slices of the returned frame, they must not write into it. The history's
+    # version is part of the key, so new or updated bars rebuild it.
+    key = (symbol, store.version(bars))
+    entry = _frames.get(key)
+    if entry is not None:
+        return entry.value
+
+    with metrics.span('prepare:comp_data'):
+        bars = bars.dropna()
+        prices = bars[list(PRICE_COLUMNS)].to_numpy(dtype=np.float32)
+        volume = bars[list(VOLUME_COLUMN)].to_numpy(dtype=np.int64)
+        prices.flags.writeable = False
+        volume.flags.writeable = False
+
+        index = bars.index.rename(None)
+        data = pd.concat([
+            pd.DataFrame(prices, index=index, columns=list(PRICE_COLUMNS.values()), copy=False),
+            pd.DataFrame(volume, index=index, columns=list(VOLUME_COLUMN.values()), copy=False),
+        ], axis=1, copy=False)
+        data.attrs['currency'] = bars['Currency'].iloc[-1] if len(bars) else None
+
+    _frames.set(key, data, FRAME_TTL)
+    return data
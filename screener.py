@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+import metrics
+
+
+RETURN_DAYS = {'1 Hafta (%)': 5, '1 Ay (%)': 21, '3 Ay (%)': 63}
+FAST_PERIOD = 20
+SLOW_PERIOD = 50
+BAND_PERIOD = 20
+BAND_WIDTH = 2
+VOLUME_PERIOD = 20
+TRADING_DAYS = 252
+
+CROSS_LABELS = {1: 'Yukarı Kesişim', -1: 'Aşağı Kesişim', 0: ''}
+
+
+def _window_mean(values, period, lag=0):
+    # mean of the `period` columns ending `lag` columns before the last one;
+    # NaN unless the whole window has values
+    end = values.shape[1] - lag
+    if end < period:
+        return np.full(values.shape[0], np.nan)
+    return values[:, end - period:end].mean(axis=1)
+
+
+def _pct_change(close, days):
+    return 100 * (close[:, -1] / close[:, -1 - days] - 1)
+
+
+def screen(panel):
+    # one row per symbol, every column computed for the whole universe with a
+    # handful of array operations over the last SLOW_PERIOD + 1 days. NaN
+    # propagates through every window, so columns of recently listed symbols
+    # stay NaN where their history is too short.
+    with metrics.span('compute:screen'), np.errstate(invalid='ignore', divide='ignore'):
+        close, volume = panel.close, panel.volume
+        columns = {'Kapanış': close[:, -1]}
+
+        for label, days in RETURN_DAYS.items():
+            columns[label] = _pct_change(close, days) if close.shape[1] > days else np.nan
+
+        # a crossover happened today when the fast average moved to the other
+        # side of the slow one since yesterday
+        fast, slow = _window_mean(close, FAST_PERIOD), _window_mean(close, SLOW_PERIOD)
+        fast_prev, slow_prev = _window_mean(close, FAST_PERIOD, 1), _window_mean(close, SLOW_PERIOD, 1)
+        cross = np.sign(fast - slow) - np.sign(fast_prev - slow_prev)
+        columns['Ortalama Kesişimi'] = np.sign(np.nan_to_num(cross))
+        columns[f'Ortalama {FAST_PERIOD}/{SLOW_PERIOD} (%)'] = 100 * (fast / slow - 1)
+
+        log_returns = np.diff(np.log(close[:, -(BAND_PERIOD + 1):]), axis=1)
+        columns['Yıllık Oynaklık (%)'] = 100 * log_returns.std(axis=1, ddof=1) * np.sqrt(TRADING_DAYS)
+
+        # position inside the Bollinger band: 0 at the lower, 1 at the upper
+        window = close[:, -BAND_PERIOD:]
+        middle = window.mean(axis=1)
+        band = BAND_WIDTH * window.std(axis=1, ddof=1)
+        columns['Bant Konumu'] = (close[:, -1] - (middle - band)) / (2 * band)
+
+        columns['Hacim Artışı (x)'] = volume[:, -1] / _window_mean(volume, VOLUME_PERIOD, 1)
+
+        df = pd.DataFrame(columns, index=panel.symbols)
+        df['Ortalama Kesişimi'] = df['Ortalama Kesişimi'].astype(int).map(CROSS_LABELS)
+        df.index.name = 'Sembol'
+    return df.dropna(subset=['Kapanış'])
@@ -0,0 +1,39 @@
+import os
+
+import pandas as pd
+
+
+# written at build time by bin/post_compile, read on every cold start
+SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'companies.csv')
+COLUMNS = ['Ülke', 'Kısa İsim', 'Şirket', 'ISIN', 'Para Birimi', 'Sembol']
+
+
+def companies_table(stocks):
+    companies = stocks.copy()
+    companies.columns = COLUMNS
+    # stored sorted, so the app can use the index as the selectbox order and
+    # look symbols up by binary search
+    return companies.set_index('Sembol').sort_index()
+
+
+def download_companies():
+    import investpy as inp
+
+    return companies_table(inp.get_stocks(country='turkey'))
+
+
+def load_companies():
+    try:
+        return pd.read_csv(SNAPSHOT_PATH, index_col='Sembol', keep_default_na=False)
+    except FileNotFoundError:
+        return None
+
+
+def save_companies(companies):
+    tmp_path = f'{SNAPSHOT_PATH}.{os.getpid()}.tmp'
+    companies.to_csv(tmp_path)
+    os.replace(tmp_path, SNAPSHOT_PATH)
+
+
+if __name__ == '__main__':
+    save_companies(download_companies())
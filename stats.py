@@ -0,0 +1,38 @@
+import metrics
+import store
+from cache import Cache
+
+
+# rolling results per (series, period), shared by all sessions of the process
+_memo = Cache(32 * 1024 * 1024, 'rolling')
+MEMO_TTL = 60 * 60
+
+
+def _rolling(key, series, period, section, stat):
+    # key names the series, e.g. (symbol, column). Its version is part of the
+    # memo key, so new or updated bars are recomputed.
+    memo_key = (key, period, stat, store.version(series))
+    entry = _memo.get(memo_key)
+    if entry is not None and len(entry.value) >= section:
+        return entry.value.iloc[-section:]
+
+    # the last `section` values only need the period - 1 rows before them
+    with metrics.span(f'compute:rolling_{stat}'):
+        window = series.iloc[-(section + period - 1):]
+        result = getattr(window.rolling(period), stat)().iloc[-section:]
+    _memo.set(memo_key, result, MEMO_TTL)
+    return result
+
+
+def rolling_mean(key, series, period, section):
+    return _rolling(key, series, period, section, 'mean')
+
+
+def rolling_std(key, series, period, section):
+    return _rolling(key, series, period, section, 'std')
+
+
+def bollinger_bands(key, series, period, section, width=2):
+    band = rolling_std(key, series, period, section) * width
+    values = series.iloc[-section:]
+    return values + band, values - band
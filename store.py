@@ -0,0 +1,77 @@
+import os
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+
+DATA_DIR = os.environ.get(
+    'BIST_DATA_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+)
+HISTORY_DAYS = 2000
+
+
+def ohlcv_path(symbol):
+    return os.path.join(DATA_DIR, 'ohlcv', f'{symbol}.parquet')
+
+
+def load_ohlcv(symbol):
+    path = ohlcv_path(symbol)
+    if not os.path.exists(path):
+        return None
+    try:
+        return pd.read_parquet(path)
+    except Exception:
+        # a half written or corrupted file is treated as missing and refetched
+        return None
+
+
+def version(df):
+    # identifies one state of a history, frame or series: new bars change the
+    # last date or the length, a last bar downloaded again while the session
+    # is open changes the hash of the last row
+    if not len(df):
+        return None
+    return df.index[-1], len(df), int(pd.util.hash_pandas_object(df.iloc[-1:]).iloc[0])
+
+
+def save_ohlcv(symbol, df):
+    path = ohlcv_path(symbol)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # per thread: a background refresh may write the same symbol concurrently
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    df.to_parquet(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def merge_ohlcv(stored, new, now):
+    df = pd.concat([stored, new])
+    df = df[~df.index.duplicated(keep='last')].sort_index()
+    return df[df.index >= now - timedelta(days=HISTORY_DAYS)]
+
+
+def update_ohlcv(symbol, download, now=None):
+    # download(start_date, end_date) returns the bars of that range, ascending
+    now = now or datetime.now()
+    stored = load_ohlcv(symbol)
+
+    if stored is None or stored.empty:
+        df = download(now - timedelta(days=HISTORY_DAYS), now)
+        save_ohlcv(symbol, df)
+        return df
+
+    # the last stored bar may have been written while the session was still
+    # open, so it is downloaded again together with everything after it.
+    # investpy needs from_date < to_date, hence the extra day.
+    start_date = stored.index[-1] - timedelta(days=1)
+    try:
+        new = download(start_date, now)
+    except Exception:
+        # no new bars yet (weekend, holiday) or upstream is down
+        return stored
+
+    df = merge_ohlcv(stored, new, now)
+    if not df.equals(stored):
+        save_ohlcv(symbol, df)
+    return df
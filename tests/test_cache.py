@@ -0,0 +1,167 @@
+import threading
+import time
+
+import pytest
+
+import cache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, 'time', clock)
+    cache.CACHE.clear()
+    yield clock
+    cache.CACHE.clear()
+
+
+def counting(**cached_kwargs):
+    calls = []
+
+    @cache.cached(**cached_kwargs)
+    def fetch(x):
+        calls.append(x)
+        return f'{x}-{len(calls)}'
+
+    return fetch, calls
+
+
+def wait_for_refresh():
+    deadline = time.monotonic() + 5
+    while cache._refreshing and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not cache._refreshing
+
+
+def test_entry_is_served_until_its_ttl(clock):
+    fetch, calls = counting(ttl=60)
+    assert fetch('a') == 'a-1'
+    clock.now += 59
+    assert fetch('a') == 'a-1'
+    assert fetch('b') == 'b-2'
+    assert calls == ['a', 'b']
+
+
+def test_expired_entry_is_served_while_it_is_refreshed(clock):
+    fetch, calls = counting(ttl=60, stale=30)
+    fetch('a')
+    clock.now += 70
+    # the stale value at once, the fresh one from the background refresh
+    assert fetch('a') == 'a-1'
+    wait_for_refresh()
+    assert fetch('a') == 'a-2'
+
+
+def test_entry_past_its_stale_window_is_fetched_again(clock):
+    fetch, calls = counting(ttl=60, stale=30)
+    fetch('a')
+    clock.now += 91
+    assert fetch('a') == 'a-2'
+    assert cache._refreshing == set()
+
+
+def test_value_ttl_shortens_the_ttl_of_a_result(clock):
+    fetch, calls = counting(ttl=60, stale=0, value_ttl=lambda value: 5 if value.endswith('-1') else 60)
+    assert fetch('a') == 'a-1'
+    clock.now += 6
+    assert fetch('a') == 'a-2'
+    clock.now += 6
+    assert fetch('a') == 'a-2'
+
+
+def test_least_recently_used_entries_are_evicted_by_size():
+    lru = cache.Cache(max_bytes=3 * cache.sizeof(b'x' * 100) + 10, name='test')
+    for key in 'abc':
+        lru.set(key, b'x' * 100, 60)
+    lru.get('a')
+    lru.set('d', b'x' * 100, 60)
+    assert list(lru.entries) == ['c', 'a', 'd']
+    assert lru.size == sum(entry.size for entry in lru.entries.values())
+
+    # a value larger than the whole cache is not stored
+    lru.set('e', b'x' * 1000, 60)
+    assert 'e' not in lru.entries
+
+
+@pytest.fixture
+def coalesced(monkeypatch):
+    # counts the callers that found a fetch of their key in flight
+    counts = []
+
+    def incr(name, amount=1, **labels):
+        if labels.get('result') == 'coalesced':
+            counts.append(labels['function'])
+
+    monkeypatch.setattr(cache.metrics, 'incr', incr)
+    cache.CACHE.clear()
+    return counts
+
+
+def concurrent_calls(fetch, coalesced, followers):
+    results = []
+
+    def call():
+        try:
+            results.append(fetch('a'))
+        except Exception as e:
+            results.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(followers + 1)]
+    threads[0].start()
+    fetch.started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while len(coalesced) < followers and time.monotonic() < deadline:
+        time.sleep(0.01)
+    fetch.release.set()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def blocking(result):
+    calls = []
+    started, release = threading.Event(), threading.Event()
+
+    @cache.cached(ttl=60)
+    def fetch(x):
+        calls.append(x)
+        started.set()
+        release.wait(5)
+        return result(len(calls))
+
+    fetch.started, fetch.release = started, release
+    return fetch, calls
+
+
+def test_concurrent_misses_share_one_fetch(coalesced):
+    fetch, calls = blocking(lambda n: f'a-{n}')
+    results = concurrent_calls(fetch, coalesced, followers=4)
+    assert len(coalesced) == 4
+    assert calls == ['a']
+    assert results == ['a-1'] * 5
+
+
+def test_failed_fetch_fails_its_waiters_and_is_not_cached(coalesced):
+    def fail(n):
+        raise ConnectionError(n)
+
+    fetch, calls = blocking(fail)
+    results = concurrent_calls(fetch, coalesced, followers=4)
+    assert calls == ['a']
+    assert len(results) == 5 and all(isinstance(result, ConnectionError) for result in results)
+    assert cache._in_flight == {}
+
+    # the next call fetches again instead of finding the error
+    with pytest.raises(ConnectionError):
+        fetch('a')
+    assert calls == ['a', 'a']
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+import compare
+
+
+PERIOD = 60
+
+
+def returns():
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range('2020-01-01', periods=400)
+    prices = pd.DataFrame(
+        100 * np.exp(np.cumsum(rng.normal(0, 0.02, (400, 3)), axis=0)),
+        index=dates,
+        columns=['A', 'LISTED', 'GAP']
+    )
+    # listed 100 rows in, and a stretch without trades later on
+    prices.iloc[:100, 1] = np.nan
+    prices.iloc[200:205, 2] = np.nan
+    benchmark = pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.01, 400))), index=dates)
+    return compare.log_returns(prices), compare.log_returns(benchmark)
+
+
+def test_rolling_beta_matches_pandas():
+    stocks, benchmark = returns()
+    correlation, beta = compare.rolling_beta(stocks, benchmark, PERIOD)
+
+    for column in stocks:
+        expected_correlation = stocks[column].rolling(PERIOD).corr(benchmark)
+        expected_beta = stocks[column].rolling(PERIOD).cov(benchmark) / benchmark.rolling(PERIOD).var()
+        pd.testing.assert_series_equal(correlation[column], expected_correlation, check_names=False)
+        pd.testing.assert_series_equal(beta[column], expected_beta, check_names=False)
+
+
+def test_rolling_beta_is_nan_until_a_full_window_after_listing():
+    stocks, benchmark = returns()
+    correlation, beta = compare.rolling_beta(stocks, benchmark, PERIOD)
+
+    first_return = stocks['LISTED'].first_valid_index()
+    first_full_window = stocks.index.get_loc(first_return) + PERIOD - 1
+    assert correlation['LISTED'].iloc[:first_full_window].isna().all()
+    assert beta['LISTED'].iloc[:first_full_window].isna().all()
+    assert correlation['LISTED'].iloc[first_full_window:].notna().all()
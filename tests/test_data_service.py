@@ -0,0 +1,47 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_service
+
+
+@pytest.fixture
+def shm_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_service, 'SHM_DIR', str(tmp_path))
+    monkeypatch.setattr(data_service, '_published', {})
+    monkeypatch.setattr(data_service, '_retired', {})
+    monkeypatch.setattr(data_service, '_mapped', {})
+    return tmp_path
+
+
+def frame(close):
+    index = pd.date_range('2020-01-01', periods=3)
+    return pd.DataFrame({'Close': np.full(3, close), 'Volume': np.arange(3), 'Currency': 'TRY'}, index=index)
+
+
+def test_published_frame_maps_back(shm_dir):
+    df = frame(1.0)
+    mapped = data_service._map_frame(data_service.publish_frame('get_comp_data-X', df))
+    pd.testing.assert_frame_equal(mapped, df, check_freq=False)
+
+
+def test_previous_version_stays_until_the_next_publish(shm_dir):
+    first = data_service.publish_frame('get_comp_data-X', frame(1.0))
+    data_service.publish_frame('get_comp_data-X', frame(2.0))
+    # a worker that was sent the first descriptor can still map it
+    assert data_service._map_frame(first)['Close'].iloc[-1] == 1.0
+
+    data_service._mapped.clear()
+    data_service.publish_frame('get_comp_data-X', frame(3.0))
+    with pytest.raises(FileNotFoundError):
+        data_service._map_frame(first)
+
+
+def test_only_frame_files_match():
+    version = f'{os.getpid()}-1700000000000000000'
+    assert data_service.FRAME_FILE_RE.fullmatch(f'get_comp_data-GARAN.{version}.index.npy')
+    assert data_service.FRAME_FILE_RE.fullmatch(f'get_comp_data-GARAN.{version}.0.npy.tmp.npy')
+    assert not data_service.FRAME_FILE_RE.fullmatch('notes.txt')
+    assert not data_service.FRAME_FILE_RE.fullmatch('other.npy')
@@ -0,0 +1,21 @@
+import numpy as np
+import pandas as pd
+
+import financials
+
+
+def test_missing_dividend_type_stays_missing():
+    types = pd.Series(['trailing_twelve_months', np.nan, 'annual'], name='Type')
+    assert financials.abbreviate_types(types).tolist()[::2] == ['TTM', 'A']
+    assert pd.isna(financials.abbreviate_types(types).iloc[1])
+
+
+def test_statement_round_trips_through_the_long_table():
+    summary = pd.DataFrame(
+        {'Total Revenue': [1.0, 2.0], 'Net Income': [3.0, 4.0]},
+        index=pd.DatetimeIndex(['2019-12-31', '2020-12-31'], name='Date')
+    )
+    statements = financials.statements_table({('income_statement', 'annual'): summary})
+    table = financials.statement(statements, 'income_statement', 'annual')
+    pd.testing.assert_frame_equal(table, summary, check_names=False)
+    assert financials.statement(statements, 'balance_sheet', 'annual') is None
@@ -0,0 +1,14 @@
+import numpy as np
+import pandas as pd
+
+import forecast
+
+
+def test_updated_last_value_is_refitted():
+    values = pd.Series(np.linspace(0, 1, 100), index=pd.bdate_range('2020-01-01', periods=100))
+    before = forecast.polynomial_forecast(('TEST', 'Close', 100), values, 1, 5)
+
+    values = values.copy()
+    values.iloc[-1] = 100.0
+    after = forecast.polynomial_forecast(('TEST', 'Close', 100), values, 1, 5)
+    assert after.iloc[-1] > before.iloc[-1]
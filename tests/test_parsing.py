@@ -0,0 +1,88 @@
+import pandas as pd
+import pytest
+
+import kap
+import parsing
+
+
+BASE_URL = 'https://uzmanpara.milliyet.com.tr'
+
+RATIOS_PAGE = '''<html><head><title>Anahtar Oranlar</title></head><body>
+<div class="header"><table><tr><td class="currency">Menü</td><td>1</td></tr></table></div>
+<div class="detL"><table>
+<tr><td class="currency">F/K</td><td class="">12,34</td></tr>
+<tr><td class="currency">PD/DD</td><td class="">1,05</td></tr>
+<tr><td class="currency bold">Piyasa Değeri</td><td class="">1.234.567,89</td></tr>
+<tr><td class="currency">Özsermaye Karlılığı</td><td class=""> -3,5 </td></tr>
+</table></div>
+<div class="detR"><table><tr><td class="currency">Sonra</td><td>9</td></tr></table></div>
+</body></html>'''.encode('utf-8')
+
+NEWS_PAGE = '''<html><body><ul class="menu"><li>Menü</li></ul>
+<ul class="newsUl">''' + ''.join(
+    f'<li><a href="/haber/{i}/" title="Haber {i}">Şirket haberi {i}</a>'
+    f'<span class="date">0{i % 9 + 1}.01.2021 10:3{i % 10}</span></li>'
+    for i in range(12)
+) + '</ul></body></html>'
+
+LISTING_PAGE = '''<html><body>
+<a href="/tr/sirket-ozeti/1">GARAN</a>
+<a href="/tr/sirket-ozeti/2">ISCTR, ISATR, ISBTR</a>
+<a href="/tr/hakkimizda">Hakkımızda</a>
+<a href="/tr/sirket-ozeti/3">GARAN</a>
+</body></html>'''.encode('utf-8')
+
+
+def test_financial_ratios():
+    df = parsing.parse_financial_ratios(RATIOS_PAGE, 'GARAN')
+    expected = pd.DataFrame(
+        {'F/K': [12.34], 'PD/DD': [1.05], 'Piyasa Değeri': [1234567.89], 'Özsermaye Karlılığı': [-3.5]},
+        index=pd.Index(['GARAN'], name='asset')
+    )
+    pd.testing.assert_frame_equal(df, expected)
+
+
+def test_news_keeps_the_first_ten_with_absolute_links():
+    df = parsing.parse_news(NEWS_PAGE.encode('utf-8'), BASE_URL)
+    assert len(df) == 10
+    assert df['link'][0] == f'<a href="{BASE_URL}/haber/0/" title="Haber 0">Şirket haberi 0</a>'
+    assert df['time'][3] == '04.01.2021'
+
+
+def test_windows_1254_pages_are_decoded():
+    df = parsing.parse_financial_ratios(RATIOS_PAGE.decode('utf-8').encode('windows-1254'), 'GARAN')
+    assert 'Özsermaye Karlılığı' in df.columns
+
+
+def test_kap_listing_and_logo():
+    assert kap.parse_listing(LISTING_PAGE) == {
+        'GARAN': '/tr/sirket-ozeti/1',
+        'ISCTR': '/tr/sirket-ozeti/2',
+        'ISATR': '/tr/sirket-ozeti/2',
+        'ISBTR': '/tr/sirket-ozeti/2',
+    }
+    page = b'<html><body><img class="comp-logo big" src="/logos/garan.png"></body></html>'
+    assert kap.parse_logo_url(page) == kap.BASE_URL + '/logos/garan.png'
+
+
+def test_same_output_as_the_beautifulsoup_parsers():
+    bs4 = pytest.importorskip('bs4')
+
+    # the parsers parsing.py replaced
+    soup = bs4.BeautifulSoup(RATIOS_PAGE, 'html.parser')
+    target_div = soup.find('div', {'class': 'detL'})
+    dt = [[i.parent.find('td', {'class': x}).text for x in ['currency', '']]
+          for i in target_div.find_all('td', {'class': 'currency'})]
+    dct = {i: [float(j.replace('.', '').replace(',', '.'))] for i, j in dt}
+    dct['asset'] = 'GARAN'
+    pd.testing.assert_frame_equal(
+        parsing.parse_financial_ratios(RATIOS_PAGE, 'GARAN'),
+        pd.DataFrame(data=dct).set_index('asset')
+    )
+
+    soup = bs4.BeautifulSoup(NEWS_PAGE, 'html.parser')
+    news = {'link': [], 'time': []}
+    for i in soup.find('ul', {'class': 'newsUl'}).find_all('li')[:10]:
+        news['link'].append(str(i.find('a')).replace('href="/', 'href="' + BASE_URL + '/'))
+        news['time'].append(i.find('span', {'class': 'date'}).text[:10])
+    pd.testing.assert_frame_equal(parsing.parse_news(NEWS_PAGE.encode('utf-8'), BASE_URL), pd.DataFrame(news))
@@ -0,0 +1,25 @@
+import pandas as pd
+
+import prepared
+
+
+def bars(close):
+    dates = pd.bdate_range('2020-01-01', periods=5, name='Date')
+    return pd.DataFrame(
+        {'Open': 1.0, 'High': 1.0, 'Low': 1.0, 'Close': close, 'Volume': 10, 'Currency': 'TRY'},
+        index=dates
+    )
+
+
+def test_prepared_frame_has_no_index_name():
+    assert prepared.prepare_comp_data('TEST', bars(5.0)).index.name is None
+
+
+def test_updated_last_bar_rebuilds_the_prepared_frame():
+    history = bars(5.0)
+    assert prepared.prepare_comp_data('UPDATED', history)['Kapanış'].iloc[-1] == 5.0
+
+    # the session's last bar downloaded again: same date, same length
+    history = history.copy()
+    history.iloc[-1, history.columns.get_loc('Close')] = 999.0
+    assert prepared.prepare_comp_data('UPDATED', history)['Kapanış'].iloc[-1] == 999.0
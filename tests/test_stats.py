@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+
+import stats
+
+
+def series():
+    return pd.Series(np.arange(300, dtype=float), index=pd.bdate_range('2020-01-01', periods=300))
+
+
+def test_rolling_mean_matches_pandas():
+    values = series()
+    expected = values.rolling(20).mean().iloc[-100:]
+    pd.testing.assert_series_equal(stats.rolling_mean(('TEST', 'Close'), values, 20, 100), expected)
+
+
+def test_updated_last_value_is_recomputed():
+    values = series()
+    assert stats.rolling_mean(('UPDATED', 'Close'), values, 20, 10).iloc[-1] == 289.5
+
+    values = values.copy()
+    values.iloc[-1] = 1e6
+    assert stats.rolling_mean(('UPDATED', 'Close'), values, 20, 10).iloc[-1] == values.iloc[-20:].mean()
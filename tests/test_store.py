@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+import store
+
+
+NOW = datetime(2021, 3, 5, 12)
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(store, 'DATA_DIR', str(tmp_path))
+    return tmp_path
+
+
+def bars(start, end, close=1.0):
+    dates = pd.bdate_range(start, end, name='Date')
+    return pd.DataFrame({'Close': close, 'Volume': 10}, index=dates)
+
+
+def test_merge_replaces_the_last_bar_and_trims_the_history():
+    stored = bars(NOW - timedelta(days=store.HISTORY_DAYS + 10), NOW, close=1.0)
+    new = bars(NOW - timedelta(days=1), NOW + timedelta(days=3), close=2.0)
+
+    merged = store.merge_ohlcv(stored, new, NOW + timedelta(days=3))
+    assert merged.index.is_unique and merged.index.is_monotonic_increasing
+    assert merged.loc[pd.Timestamp(NOW.date()), 'Close'] == 2.0
+    assert merged.index[-1] == new.index[-1]
+    assert merged.index[0] >= pd.Timestamp(NOW + timedelta(days=3) - timedelta(days=store.HISTORY_DAYS))
+
+
+def test_first_update_downloads_the_whole_history(data_dir):
+    requests = []
+
+    def download(start, end):
+        requests.append((start, end))
+        return bars(start, end)
+
+    df = store.update_ohlcv('TEST', download, NOW)
+    assert requests == [(NOW - timedelta(days=store.HISTORY_DAYS), NOW)]
+    pd.testing.assert_frame_equal(store.load_ohlcv('TEST'), df, check_freq=False)
+
+
+def test_later_updates_download_again_from_the_last_stored_bar(data_dir):
+    store.save_ohlcv('TEST', bars(NOW - timedelta(days=30), NOW - timedelta(days=1)))
+    last = store.load_ohlcv('TEST').index[-1]
+    requests = []
+
+    def download(start, end):
+        requests.append((start, end))
+        return bars(last, end, close=3.0)
+
+    df = store.update_ohlcv('TEST', download, NOW)
+    assert requests == [(last - timedelta(days=1), NOW)]
+    assert df.loc[last, 'Close'] == 3.0
+    assert df.index[-1] == pd.Timestamp(NOW.date())
+    pd.testing.assert_frame_equal(store.load_ohlcv('TEST'), df, check_freq=False)
+
+
+def test_failed_update_keeps_the_stored_history(data_dir):
+    stored = bars(NOW - timedelta(days=30), NOW)
+    store.save_ohlcv('TEST', stored)
+
+    def download(start, end):
+        raise ConnectionError
+
+    pd.testing.assert_frame_equal(store.update_ohlcv('TEST', download, NOW), stored, check_freq=False)
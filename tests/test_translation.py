@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+import translation
+
+
+@pytest.fixture
+def backends(tmp_path, monkeypatch):
+    monkeypatch.setattr(translation, 'DB_PATH', os.path.join(tmp_path, 'translations.sqlite'))
+    monkeypatch.setattr(translation, '_local', type(translation._local)())
+    monkeypatch.setattr(translation, '_failed_until', {})
+    monkeypatch.setattr(translation, 'BACKENDS', ['google', 'identity'])
+    monkeypatch.setattr(translation, 'BACKEND_COOLDOWN', 0)
+    sent = []
+
+    def google(texts, src, dest):
+        if any(len(text) > 5000 for text in texts):
+            raise ValueError('text too long')
+        sent.extend(texts)
+        return [text.upper() for text in texts]
+
+    functions = dict(translation.BACKEND_FUNCTIONS, google=google)
+    monkeypatch.setattr(translation, 'BACKEND_FUNCTIONS', functions)
+    return functions, sent
+
+
+def test_long_text_is_translated_in_pieces(backends):
+    text = 'A sentence. ' * 1000
+    [translated] = translation.translate([text])
+    assert translated.split() == text.upper().split()
+    assert all(len(piece) <= translation.CHUNK_CHARS for piece in backends[1])
+    assert translation._failed_until == {}
+
+
+def test_failed_backend_is_skipped_during_its_cooldown(backends, monkeypatch):
+    functions, sent = backends
+    calls = []
+
+    def failing(texts, src, dest):
+        calls.append(texts)
+        raise ConnectionError
+
+    functions['google'] = failing
+    monkeypatch.setattr(translation, 'BACKEND_COOLDOWN', 60)
+    assert translation.translate(['one']) == ['one']
+    assert translation.translate(['two']) == ['two']
+    assert len(calls) == 1
+
+
+def test_pretranslate_does_not_fall_through_to_identity(backends, monkeypatch):
+    functions, sent = backends
+
+    def failing(texts, src, dest):
+        raise ConnectionError
+
+    functions['google'] = failing
+    monkeypatch.setattr(translation, '_pretranslate_started', True)
+    translation._pretranslate(['A'], lambda symbol: f'profile of {symbol}')
+    assert translation.lookup(['profile of A']) == [None]
+    # stopped, so the next start tries again
+    assert translation._pretranslate_started is False
@@ -0,0 +1,223 @@
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import lazy
+import metrics
+import store
+from upstream import limited
+
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = os.path.join(store.DATA_DIR, 'translations.sqlite')
+# tried in order until one answers; identity shows the source text and always
+# works, so the page never fails on a translation
+BACKENDS = os.environ.get('BIST_TRANSLATION_BACKENDS', 'google,argos,identity').split(',')
+# BIST_PRETRANSLATE=1 translates every company profile in the background
+PRETRANSLATE = os.environ.get('BIST_PRETRANSLATE', '') not in ('', '0')
+# Google rejects requests over 5000 characters
+CHUNK_CHARS = 4500
+# a backend that failed is skipped for this long, so reruns fall through to
+# the next one at once instead of waiting out its timeout again
+BACKEND_COOLDOWN = 5 * 60
+# batches the pre-translation tries, a cooldown apart, before it stops
+PRETRANSLATE_ATTEMPTS = 3
+
+googletrans = lazy.module('googletrans')
+
+_local = threading.local()
+_failed_until = {}
+_pretranslate_started = False
+_pretranslate_lock = threading.Lock()
+
+
+def _db():
+    # sqlite connections cannot be shared between threads
+    db = getattr(_local, 'db', None)
+    if db is None:
+        os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+        db = _local.db = sqlite3.connect(DB_PATH, timeout=30)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute(
+            'CREATE TABLE IF NOT EXISTS translations ('
+            'key TEXT PRIMARY KEY, text TEXT NOT NULL, backend TEXT NOT NULL, created REAL NOT NULL)'
+        )
+    return db
+
+
+def text_key(text, src, dest):
+    return hashlib.sha1(f'{src}\0{dest}\0{text}'.encode('utf-8')).hexdigest()
+
+
+@limited('translate')
+def _google(texts, src, dest):
+    translator = googletrans.Translator(service_urls=['translate.googleapis.com'])
+    return [t.text for t in translator.translate(texts, src=src, dest=dest)]
+
+
+def _argos(texts, src, dest):
+    # offline models, only when argostranslate and its en->tr package are
+    # installed
+    from argostranslate import translate
+
+    return [translate.translate(text, src, dest) for text in texts]
+
+
+def _identity(texts, src, dest):
+    return list(texts)
+
+
+BACKEND_FUNCTIONS = {
+    'google': _google,
+    'argos': _argos,
+    'identity': _identity,
+}
+
+
+def lookup(texts, src='en', dest='tr'):
+    keys = [text_key(text, src, dest) for text in texts]
+    found = {}
+    for start in range(0, len(keys), 500):
+        chunk = keys[start:start + 500]
+        rows = _db().execute(
+            f'SELECT key, text FROM translations WHERE key IN ({",".join("?" * len(chunk))})', chunk
+        )
+        found.update(rows)
+    return [found.get(key) for key in keys]
+
+
+def _save(texts, translations, backend, src, dest):
+    db = _db()
+    with db:
+        db.executemany(
+            'INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?)',
+            [(text_key(text, src, dest), translated, backend, time.time())
+             for text, translated in zip(texts, translations)]
+        )
+
+
+def _split(text):
+    # a text over CHUNK_CHARS is translated in pieces of whole sentences, cut
+    # only where a sentence itself is too long, and joined again
+    if len(text) <= CHUNK_CHARS:
+        return [text]
+    pieces = []
+    for sentence in re.split(r'(?<=[.!?])\s+', text):
+        if pieces and len(pieces[-1]) + 1 + len(sentence) <= CHUNK_CHARS:
+            pieces[-1] += ' ' + sentence
+        else:
+            pieces.extend(sentence[start:start + CHUNK_CHARS] for start in range(0, len(sentence), CHUNK_CHARS))
+    return pieces
+
+
+def _chunks(texts):
+    chunk, size = [], 0
+    for text in texts:
+        if chunk and size + len(text) > CHUNK_CHARS:
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(text)
+        size += len(text)
+    if chunk:
+        yield chunk
+
+
+def _translate_missing(texts, src, dest, backends):
+    # None when no backend answered
+    pieces = [_split(text) for text in texts]
+    flat = [piece for text_pieces in pieces for piece in text_pieces]
+    for backend in backends:
+        if time.time() < _failed_until.get(backend, 0):
+            metrics.incr('bist_translation_skipped_total', backend=backend)
+            continue
+        try:
+            translated = iter([t for chunk in _chunks(flat) for t in BACKEND_FUNCTIONS[backend](chunk, src, dest)])
+        except Exception:
+            _failed_until[backend] = time.time() + BACKEND_COOLDOWN
+            metrics.incr('bist_translation_errors_total', backend=backend)
+            logger.warning('Translation backend %s failed, skipping it for %d seconds',
+                           backend, BACKEND_COOLDOWN, exc_info=True)
+            continue
+        translations = [' '.join(next(translated) for _ in text_pieces) for text_pieces in pieces]
+        metrics.incr('bist_translations_total', len(texts), backend=backend)
+        # the stand-in's output is not stored, a real translation replaces it
+        # once a backend is back
+        if backend != 'identity':
+            _save(texts, translations, backend, src, dest)
+        return translations
+    return None
+
+
+def translate(texts, src='en', dest='tr'):
+    # stored translations are read in one query, the rest go to the backends
+    # in chunks and are stored
+    translations = lookup(texts, src, dest)
+    missing = sorted({text for text, translated in zip(texts, translations) if translated is None})
+    if missing:
+        done = dict(zip(missing, _translate_missing(missing, src, dest, BACKENDS) or missing))
+        translations = [done[text] if translated is None else translated
+                        for text, translated in zip(texts, translations)]
+    return translations
+
+
+def _summary_batches(symbols, fetch_summary):
+    # profiles a chunk at a time, so the work done so far is kept
+    batch = []
+    for symbol in symbols:
+        try:
+            summary = fetch_summary(symbol)
+        except Exception:
+            continue
+        if not summary:
+            continue
+        batch.append(summary)
+        if sum(len(text) for text in batch) >= CHUNK_CHARS:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _pretranslate_batch(texts):
+    # only real backends: the stand-in's output is not stored, so falling
+    # through to it would translate nothing
+    backends = [backend for backend in BACKENDS if backend != 'identity']
+    for attempt in range(PRETRANSLATE_ATTEMPTS):
+        if attempt:
+            time.sleep(BACKEND_COOLDOWN)
+        missing = [text for text, translated in zip(texts, lookup(texts)) if translated is None]
+        if not missing or _translate_missing(missing, 'en', 'tr', backends) is not None:
+            return True
+    return False
+
+
+def _pretranslate(symbols, fetch_summary):
+    global _pretranslate_started
+    translated = 0
+    for batch in _summary_batches(symbols, fetch_summary):
+        if not _pretranslate_batch(batch):
+            logger.warning('Stopped pre-translating after %d profiles, no translation backend answered', translated)
+            # the next start_pretranslate call tries again
+            with _pretranslate_lock:
+                _pretranslate_started = False
+            return
+        translated += len(batch)
+    logger.info('Pre-translated %d company profiles', translated)
+
+
+def start_pretranslate(symbols, fetch_summary):
+    # fetch_summary(symbol) returns the English profile text
+    global _pretranslate_started
+    if not PRETRANSLATE:
+        return
+    with _pretranslate_lock:
+        if _pretranslate_started:
+            return
+        _pretranslate_started = True
+    threading.Thread(target=_pretranslate, args=(symbols, fetch_summary),
+                     name='pretranslate', daemon=True).start()
@@ -0,0 +1,86 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+import metrics
+
+
+# how many calls may be in flight against each upstream at the same time
+CONCURRENCY = {
+    'investpy': 4,
+    'kap': 2,
+    'uzmanpara': 2,
+    'translate': 1,
+}
+
+# how many calls each upstream may start per second on average, and how many
+# may start back to back before that rate applies
+RATE = {
+    'investpy': (2, 4),
+    'kap': (2, 4),
+    'uzmanpara': (2, 4),
+    'translate': (1, 2),
+}
+
+_semaphores = {source: threading.BoundedSemaphore(n) for source, n in CONCURRENCY.items()}
+
+
+class TokenBucket:
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        # takes a token, possibly one that is only refilled later, and
+        # returns how long the caller has to sleep until it exists. Waiting
+        # callers are thus served in arrival order at the bucket's rate.
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate)
+
+
+_buckets = {source: TokenBucket(*RATE[source]) for source in CONCURRENCY}
+
+POOL = ThreadPoolExecutor(max_workers=16, thread_name_prefix='prefetch')
+
+
+def limited(source):
+    # only wrap the function that does the network call: the semaphores are
+    # not reentrant, nesting two limited calls of a source can deadlock
+    semaphore = _semaphores[source]
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            bucket = _buckets.get(source)
+            wait = bucket.acquire() if bucket is not None else 0
+            if wait:
+                metrics.observe('bist_upstream_throttled_seconds', wait, source=source)
+                time.sleep(wait)
+            with semaphore:
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                except Exception:
+                    metrics.incr('bist_upstream_errors_total', source=source)
+                    raise
+                finally:
+                    metrics.observe('bist_upstream_seconds', time.perf_counter() - start, source=source)
+        return wrapper
+
+    return decorator
+
+
+def prefetch(calls, pool=POOL):
+    # calls maps a name to (function, *args); all of them are started at once.
+    # Large batches get their own pool, so that tasks waiting for upstream
+    # tokens do not hold the threads the page panels are fetched on.
+    return {name: pool.submit(metrics.bind(func), *args) for name, (func, *args) in calls.items()}